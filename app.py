@@ -1,9 +1,46 @@
+import uuid
+from math import comb
+
 import numpy as np
 import pandas as pd
+import plotly.graph_objects as go
 import streamlit as st
 import streamlit.components.v1 as components
-from pyvis.network import Network
-import plotly.graph_objects as go
+
+from cd40_immunosome import (
+    PARAMETER_RANGES,
+    RATE_CONSTANTS,
+    RESPONSE_METRICS,
+    build_surrogate,
+    cached_simulate_signaling_ode,
+    cached_simulate_signaling_ode_batch,
+    crispr_synergy_table,
+    fit_time_courses,
+    generate_project_summary,
+    get_job_manager,
+    get_result_store,
+    get_surrogate,
+    get_trajectory_cache,
+    global_sensitivity_stored,
+    load_target_library,
+    load_time_courses,
+    iter_monte_carlo_stored,
+    render_network_html,
+    run_combinatorial_screen,
+    run_monte_carlo,
+    run_null_model_comparison,
+    run_stochastic_ensemble,
+    solve_signaling_adaptive,
+    solve_steady_state,
+    summarize_monte_carlo,
+)
+from cd40_immunosome import instrumentation
+from cd40_immunosome.crispr import CRISPR_TARGET_EFFECTS
+from cd40_immunosome.montecarlo import MC_RAW_TRAJECTORY_LIMIT
+from cd40_immunosome.stochastic import STOCHASTIC_METHODS
+from cd40_immunosome.store import ARCHIVE_DOWNLOAD_MAX_BYTES
+from cd40_immunosome.surrogate import SURROGATE_NODES, SURROGATE_PARAMETERS, SURROGATE_TOLERANCE
+
 # --- PAGE CONFIG ---
 st.set_page_config(
     page_title="CD40 Systems Biology Framework",
@@ -12,104 +49,6 @@ st.set_page_config(
 )
 
 
-def generate_project_summary(scaffold, ligand, k1, k2, k3, k4, k6, k7, k8, cd40_input):
-    return f"""
-CD40 IMMUNOSOME – SYSTEMS BIOLOGY SUMMARY
-======================================
-
-Current setup
--------------
-Scaffold: {scaffold}
-Ligand: {ligand}
-Kinetic constants: k1={k1:.3f}, k2={k2:.3f}, k3={k3:.3f}, k4={k4:.3f}, k6={k6:.3f}, k7={k7:.3f}, k8={k8:.3f}
-CD40 input level: {cd40_input:.2f}
-
-Modeling note
--------------
-Kinetic simulations are solved numerically as a coupled ODE system:
-  dTRAF6/dt = k1·CD40 - k2·TRAF6 - k6·SOCS1·TRAF6
-  dNFκB/dt = k3·TRAF6 - k4·NFκB
-  dSOCS1/dt = k7·NFκB - k8·SOCS1
-
-CRISPR synergy note
--------------------
-Synergy is computed dynamically from model responses:
-  Score = ((KO+Agonist AUC - Baseline AUC) / Baseline AUC) × 100
-
-Disclaimer
-----------
-Outputs are hypothesis-generation aids and do not replace wet-lab validation.
-"""
-
-
-def simulate_signaling_ode(k1, k2, k3, k4, k6, k7, k8, cd40_input=1.0, t_max=200, points=2000):
-    """Numerically solve coupled ODEs using an RK4 integrator."""
-    t = np.linspace(0, t_max, points)
-    dt = t[1] - t[0]
-
-    traf6 = np.zeros(points)
-    nfkb = np.zeros(points)
-    socs1 = np.zeros(points)
-
-    def rhs(y):
-        y_traf6, y_nfkb, y_socs1 = y
-        d_traf6 = k1 * cd40_input - k2 * y_traf6 - k6 * y_socs1 * y_traf6
-        d_nfkb = k3 * y_traf6 - k4 * y_nfkb
-        d_socs1 = k7 * y_nfkb - k8 * y_socs1
-        return np.array([d_traf6, d_nfkb, d_socs1], dtype=float)
-
-    for i in range(points - 1):
-        y = np.array([traf6[i], nfkb[i], socs1[i]], dtype=float)
-        rk1 = rhs(y)
-        rk2 = rhs(y + 0.5 * dt * rk1)
-        rk3 = rhs(y + 0.5 * dt * rk2)
-        rk4 = rhs(y + dt * rk3)
-        y_next = y + (dt / 6.0) * (rk1 + 2 * rk2 + 2 * rk3 + rk4)
-        traf6[i + 1], nfkb[i + 1], socs1[i + 1] = y_next
-
-    return t, traf6, nfkb, socs1
-
-
-
-
-
-
-def run_null_model_comparison(k1, k2, k3, k4, k6, k7, k8, cd40_input):
-    # With feedback (3-variable model)
-    t, _, nfkb_feedback, _ = simulate_signaling_ode(k1, k2, k3, k4, k6, k7, k8, cd40_input)
-
-    # True linear null (no SOCS1 production and no inhibition)
-    t, _, nfkb_null, _ = simulate_signaling_ode(k1, k2, k3, k4, 0.0, 0.0, k8, cd40_input)
-
-    comparison_df = pd.DataFrame(
-        {
-            "Time": t,
-            "With SOCS1 Feedback": nfkb_feedback,
-            "Null Model (No Feedback)": nfkb_null,
-        }
-    )
-    return comparison_df
-
-
-def run_monte_carlo(k1, k2, k3, k4, k6, k7, k8, cd40_input, iterations=50, points=800, seed=None):
-    mc_results = []
-    rng = np.random.default_rng(seed)
-
-    for _ in range(iterations):
-        r_k1 = k1 * rng.uniform(0.8, 1.2)
-        r_k2 = k2 * rng.uniform(0.8, 1.2)
-        r_k3 = k3 * rng.uniform(0.8, 1.2)
-        r_k4 = k4 * rng.uniform(0.8, 1.2)
-        r_k6 = k6 * rng.uniform(0.8, 1.2)
-        r_k7 = k7 * rng.uniform(0.8, 1.2)
-        r_k8 = k8 * rng.uniform(0.8, 1.2)
-
-        t, _, nfkb, _ = simulate_signaling_ode(r_k1, r_k2, r_k3, r_k4, r_k6, r_k7, r_k8, cd40_input, points=points)
-        mc_results.append(nfkb)
-
-    return t, np.array(mc_results)
-
-
 SCAFFOLD_MODELS = {
     "Liposome": {"clustering": "Moderate", "release": "Fast", "risk": "Transient signaling", "gain": 45},
     "Exosome": {"clustering": "High", "release": "Physiological", "risk": "Heterogeneous uptake", "gain": 72},
@@ -117,13 +56,6 @@ SCAFFOLD_MODELS = {
     "Gold NP": {"clustering": "Very High", "release": "None", "risk": "Non-physiological signaling", "gain": 94},
 }
 
-CRISPR_TARGET_EFFECTS = {
-    "SOCS1": {"k6_mult": 0.40, "note": "Reduces SOCS1-mediated inhibition strength on TRAF6."},
-    "PD-L1": {"k3_mult": 1.08, "note": "Improves effective APC→T-cell functional propagation proxy."},
-    "CTLA-4": {"k3_mult": 1.05, "note": "Increases co-stimulation efficiency proxy."},
-    "IL-10": {"k4_mult": 0.92, "note": "Reduces anti-inflammatory shutdown pressure."},
-}
-
 DARK_PROTEOME_HYPOTHESES = {
     "C1orf112": "LRR-containing architecture suggests a potential adaptor-like role influencing receptor-proximal clustering dynamics.",
     "FAM210A": "Coiled-coil structure may mediate transient protein–protein interactions within immune signaling complexes.",
@@ -139,6 +71,231 @@ SUPPLEMENTARY_FEATURES = {
 }
 
 
+def render_monte_carlo_summary(summary):
+    """Mean ± σ band, summary metrics and AUC histogram for a (possibly partial) Monte Carlo summary."""
+    t_plot = summary["t"][::5]
+    mean = summary["mean"][::5]
+    std = summary["std"][::5]
+    mc_plot_df = pd.DataFrame(
+        {
+            "Mean Response": mean,
+            "Upper (+1σ)": mean + std,
+            "Lower (-1σ)": mean - std,
+        },
+        index=t_plot,
+    )
+    st.line_chart(mc_plot_df, width="stretch")
+    st.caption("Monte Carlo uses 800 solver points and plotting is downsampled by 5× for faster rendering.")
+
+    st.markdown("#### 3. Monte Carlo Summary Metrics")
+
+    mcol1, mcol2 = st.columns(2)
+    with mcol1:
+        st.metric("Mean Peak NF-κB", f"{summary['peak_mean']:.3f}")
+        st.caption(f"Std Dev: ±{summary['peak_std']:.3f}")
+    with mcol2:
+        st.metric("Mean Time-to-Peak", f"{summary['t_peak_mean']:.2f}")
+        st.caption(f"Std Dev: ±{summary['t_peak_std']:.2f}")
+
+    hist_edges = summary["auc_hist_edges"]
+    hist_centers = np.round((hist_edges[:-1] + hist_edges[1:]) / 2, 2)
+    auc_hist_df = pd.DataFrame({"Frequency": summary["auc_hist_counts"]}, index=hist_centers)
+    auc_hist_df.index.name = "AUC Bin Center"
+    st.bar_chart(auc_hist_df, width="stretch")
+    st.caption(f"AUC Mean: {summary['auc_mean']:.2f} | Std Dev: ±{summary['auc_std']:.2f}")
+    if summary["auc_underflow"] or summary["auc_overflow"]:
+        st.caption(f"AUC outside histogram range: {summary['auc_underflow']} below, {summary['auc_overflow']} above.")
+
+
+def render_stochastic_ensemble(ensemble):
+    """Single-cell bands against the ODE curve, plus peak and time-to-peak distributions."""
+    t_plot = ensemble["t"][::2]
+    quantiles = ensemble["quantiles"]
+    noise_df = pd.DataFrame(
+        {
+            "Deterministic (ODE)": ensemble["deterministic"][::2],
+            "Cell mean": ensemble["mean"][::2],
+            "5th percentile": quantiles[0.05][::2],
+            "Median cell": quantiles[0.5][::2],
+            "95th percentile": quantiles[0.95][::2],
+        },
+        index=t_plot,
+    )
+    st.line_chart(noise_df, width="stretch")
+    method_name = "exact SSA" if ensemble["method"] == "ssa" else "tau-leaping"
+    st.caption(
+        f"{ensemble['cells']:,} cells at Ω = {ensemble['volume']:g} molecules per unit, simulated with {method_name} "
+        f"(~{ensemble['expected_events']:,.0f} reaction events per cell)."
+    )
+
+    ncol1, ncol2, ncol3 = st.columns(3)
+    with ncol1:
+        st.metric(
+            "Mean single-cell peak NF-κB",
+            f"{ensemble['peak_mean']:.3f}",
+            delta=f"{ensemble['peak_mean'] - ensemble['deterministic_peak']:+.3f} vs ODE",
+            delta_color="off",
+        )
+        st.caption(f"Std Dev: ±{ensemble['peak_std']:.3f}")
+    with ncol2:
+        st.metric("Peak CV (cell-to-cell)", f"{100 * ensemble['peak_cv']:.1f}%")
+    with ncol3:
+        st.metric(
+            "Mean single-cell time-to-peak",
+            f"{ensemble['t_peak_mean']:.1f}",
+            delta=f"{ensemble['t_peak_mean'] - ensemble['deterministic_t_peak']:+.1f} vs ODE",
+            delta_color="off",
+        )
+        st.caption(f"Std Dev: ±{ensemble['t_peak_std']:.1f}")
+
+    hcol1, hcol2 = st.columns(2)
+    for column, name, label in ((hcol1, "peak", "Peak NF-κB"), (hcol2, "t_peak", "Time-to-peak")):
+        counts, edges = np.histogram(ensemble[name], bins=30)
+        hist_df = pd.DataFrame({"Cells": counts}, index=np.round((edges[:-1] + edges[1:]) / 2, 2))
+        hist_df.index.name = label
+        with column:
+            st.bar_chart(hist_df, width="stretch")
+    st.caption(
+        "A cell's peak is the maximum of its own noisy trajectory, so it sits above the ODE peak, and when the "
+        "ODE response plateaus instead of overshooting, single-cell maxima spread along the plateau."
+    )
+
+
+def render_surrogate_panel(tab_select, k1, k2, k3, k4, k6, k7, k8, cd40_input):
+    """Surrogate metrics with error bounds and the k6 × k7 phase diagram, or the button that builds the table.
+
+    Returns whether the metrics were answered from the table (rather than solved exactly or unavailable).
+    """
+    st.markdown("### ⚡ Surrogate Response Surface")
+    surrogate = get_surrogate()
+    if surrogate is None:
+        st.caption(
+            f"No response table yet. Building it solves {SURROGATE_NODES}^{len(SURROGATE_PARAMETERS)} = "
+            f"{SURROGATE_NODES ** len(SURROGATE_PARAMETERS):,} parameter sets over the slider ranges once (adaptive solver, "
+            "all CPUs) and keeps the table in the result store for every later session."
+        )
+        if st.button("Build surrogate table"):
+            submit_background_job("surrogate_job", "surrogate_build", "surrogate", build_surrogate)
+        if st.session_state.surrogate_job is not None:
+            background_job_panel("surrogate_job", "surrogate_build", "Surrogate build", "solves")
+        return False
+
+    tolerance = st.select_slider(
+        "Error tolerance", options=[0.01, 0.02, 0.05, 0.1, 0.2], value=SURROGATE_TOLERANCE, format_func="{:.0%}".format,
+        help="Points whose peak, AUC or steady-state bound exceeds this are solved exactly instead.",
+    )
+    with instrumentation.phase(tab_select, "surrogate"):
+        answer = surrogate.query(
+            k1, k2, k3, k4, k6, k7, k8, cd40_input, tolerance=tolerance, metrics=("peak", "auc", "steady_state")
+        )
+    exact = bool(answer["exact"][0])
+    for column, (name, label) in zip(
+        st.columns(4), (("peak", "NF-κB peak"), ("t_peak", "Time to peak"), ("auc", "NF-κB AUC"), ("steady_state", "Steady state"))
+    ):
+        bound = "" if exact else f" ±{answer[f'{name}_bound'][0]:.1%}"
+        column.metric(label, f"{answer[name][0]:.3f}{bound}")
+    if exact:
+        st.caption(f"Solved exactly: the table's error bound exceeds {tolerance:.0%} here.")
+    else:
+        st.caption(
+            "Interpolated from the table; ± is the relative error bound (calibrated to cover "
+            f"{surrogate.meta['result'].get('coverage', 0.95):.0%} of held-out errors)."
+        )
+
+    phase_metric = st.selectbox("Phase diagram output", list(RESPONSE_METRICS), key="surrogate_phase_metric")
+    with instrumentation.phase(tab_select, "surrogate"):
+        k6_values, k7_values, phase, phase_bound = surrogate.phase_diagram(
+            k1, k2, k3, k4, k6, k7, k8, cd40_input, metric=phase_metric
+        )
+    fig = go.Figure(
+        go.Heatmap(
+            x=k6_values, y=k7_values, z=phase, customdata=phase_bound, colorscale="Viridis", colorbar={"title": phase_metric},
+            hovertemplate="k6=%{x:.3f}<br>k7=%{y:.3f}<br>%{z:.3f} ±%{customdata:.1%}<extra></extra>",
+        )
+    )
+    fig.add_trace(go.Scatter(x=[k6], y=[k7], mode="markers", marker={"color": "white", "size": 10, "line": {"width": 2}}, showlegend=False))
+    fig.update_layout(xaxis_title="k6 (SOCS1 inhibition strength)", yaxis_title="k7 (NF-κB → SOCS1 induction)", height=420)
+    with instrumentation.phase(tab_select, "render"):
+        st.plotly_chart(fig, width="stretch")
+    st.caption(
+        f"k6 × k7 feedback plane at the other sidebar values, read from the table alone "
+        f"(median bound ±{np.median(phase_bound):.1%}); the marker is the current setting."
+    )
+    return not exact
+
+
+def archive_download_button(stored, label, file_name):
+    """Download button for a stored result's zip, or where to find it when it is too large to serve."""
+    if stored.nbytes > ARCHIVE_DOWNLOAD_MAX_BYTES:
+        st.caption(
+            f"This result ({stored.nbytes / 1e6:,.0f} MB) is too large to download through the browser; "
+            f"its `.npy` arrays are in `{stored.path}`."
+        )
+        return
+    st.download_button(label, data=stored.archive_file, file_name=file_name, mime="application/zip")
+
+
+def session_id():
+    """Stable id of this browser session, used as its job subscription."""
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
+
+def release_background_job(job_state_key):
+    """Drop this session's subscription to its current job (cancelling it if nobody else waits on it)."""
+    key = st.session_state.get(job_state_key)
+    job = get_job_manager().get(key) if key is not None else None
+    if job is not None:
+        get_job_manager().cancel(job, subscriber=session_id())
+    st.session_state[job_state_key] = None
+
+
+def submit_background_job(job_state_key, result_state_key, kind, fn, *args, **kwargs):
+    """Start (or join) a background job for this session, replacing the session's previous one.
+
+    Clicking Run again while the same job is in flight keeps the one subscription.
+    """
+    job = get_job_manager().submit(kind, fn, *args, subscriber=session_id(), **kwargs)
+    if st.session_state.get(job_state_key) not in (None, job.key):
+        release_background_job(job_state_key)
+    st.session_state[job_state_key] = job.key
+    st.session_state[result_state_key] = None
+
+
+@st.fragment(run_every=0.5)
+def background_job_panel(job_state_key, result_state_key, label, unit, render_partial=None):
+    """Poll a background job: progress, cancel button, partial results; hand over the result when done."""
+    key = st.session_state.get(job_state_key)
+    job = get_job_manager().get(key) if key is not None else None
+    if job is None:
+        return
+    snapshot = job.snapshot()
+    if snapshot["status"] == "done":
+        st.session_state[result_state_key] = snapshot["result"]
+        release_background_job(job_state_key)
+        st.rerun()
+    if snapshot["status"] == "failed":
+        st.error(f"{label} failed: {snapshot['error']}")
+        return
+    if snapshot["status"] == "cancelled":
+        st.warning(f"{label} was cancelled.")
+        return
+
+    if snapshot["total"]:
+        text = f"{label}: {snapshot['done']:,}/{snapshot['total']:,} {unit} · {snapshot['elapsed_s']:.1f} s"
+    else:
+        text = f"{label}: {snapshot['status']}…"
+    st.progress(snapshot["fraction"], text=text)
+    if snapshot["subscribers"] > 1:
+        st.caption(f"Shared with {snapshot['subscribers'] - 1} other session(s) running the same job.")
+    if st.button("Cancel", key=f"{job_state_key}_cancel"):
+        release_background_job(job_state_key)
+        st.rerun()
+    if render_partial is not None and snapshot["partial"] is not None:
+        render_partial(snapshot["partial"])
+
+
 with st.sidebar:
     st.markdown("""
     <div style="background: linear-gradient(135deg, #1e3c72 0%, #2a5298 100%); padding: 20px; border-radius: 16px; color: white; text-align: center; margin-bottom: 12px;">
@@ -153,6 +310,7 @@ with st.sidebar:
             "Immunosome Builder",
             "CRISPR Synergy",
             "Kinetic Simulator (ODE)",
+            "Global Sensitivity",
             "Model Validation (Robustness)",
             "Dark Proteome Explorer",
             "Molecular Validation",
@@ -164,17 +322,53 @@ with st.sidebar:
     ligand = st.selectbox("CD40 Agonist Model", ["CD40L (Native)", "Selicrelumab", "CP-870,893", "Dacetuzumab"])
 
     st.subheader("⚙️ ODE Parameters")
-    k1 = st.slider("k1 (CD40→TRAF6 recruitment)", 0.01, 0.20, 0.08)
-    k2 = st.slider("k2 (TRAF6 decay)", 0.01, 0.20, 0.06)
-    k3 = st.slider("k3 (TRAF6→NF-κB activation)", 0.01, 0.25, 0.10)
-    k4 = st.slider("k4 (NF-κB decay)", 0.01, 0.20, 0.05)
-    k6 = st.slider("k6 (SOCS1 inhibition strength)", 0.0, 0.5, 0.05)
-    k7 = st.slider("k7 (NF-κB → SOCS1 induction)", 0.0, 0.5, 0.05)
-    k8 = st.slider("k8 (SOCS1 decay)", 0.01, 0.5, 0.1)
-    cd40_input = st.slider("CD40 input level", 0.5, 2.0, 1.0, 0.1)
+    k1 = st.slider(*PARAMETER_RANGES["k1"])
+    k2 = st.slider(*PARAMETER_RANGES["k2"])
+    k3 = st.slider(*PARAMETER_RANGES["k3"])
+    k4 = st.slider(*PARAMETER_RANGES["k4"])
+    k6 = st.slider(*PARAMETER_RANGES["k6"])
+    k7 = st.slider(*PARAMETER_RANGES["k7"])
+    k8 = st.slider(*PARAMETER_RANGES["k8"])
+    cd40_input = st.slider(*PARAMETER_RANGES["cd40_input"])
+
+    cache_stats = get_trajectory_cache().stats()
+    st.caption(
+        f"Trajectory cache: {cache_stats['entries']} entries, "
+        f"{cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%})"
+    )
+    surrogate_mode = st.checkbox(
+        "⚡ Surrogate mode", value=False,
+        help=(
+            "Answer response metrics from a precomputed table with error bounds. The Kinetic Simulator then skips "
+            "its exact solves unless the bound is too loose or you ask for them."
+        ),
+    )
+    show_perf_panel = st.checkbox("⏱ Performance panel", value=False)
+
+if show_perf_panel or instrumentation.enabled():
+    instrumentation.configure_logging_from_env()
+    instrumentation.start_rerun(tab_select)
 
 if "mc_results" not in st.session_state:
     st.session_state.mc_results = None
+if "gsa_results" not in st.session_state:
+    st.session_state.gsa_results = None
+if "screen_results" not in st.session_state:
+    st.session_state.screen_results = None
+if "fit_results" not in st.session_state:
+    st.session_state.fit_results = None
+if "mc_job" not in st.session_state:
+    st.session_state.mc_job = None
+if "gsa_job" not in st.session_state:
+    st.session_state.gsa_job = None
+if "noise_results" not in st.session_state:
+    st.session_state.noise_results = None
+if "noise_job" not in st.session_state:
+    st.session_state.noise_job = None
+if "surrogate_build" not in st.session_state:
+    st.session_state.surrogate_build = None
+if "surrogate_job" not in st.session_state:
+    st.session_state.surrogate_job = None
 
 st.title("🛡️ CD40 Immunosome: A Systems Biology Framework")
 st.caption("ODE-backed kinetic simulation and dynamic CRISPR synergy scoring.")
@@ -185,23 +379,10 @@ if tab_select == "Immunosome Builder":
     col1, col2 = st.columns([2, 1])
 
     with col1:
-        net = Network(height="500px", width="100%", bgcolor="white", font_color="black")
-        net.add_node("NP", label=f"Vehicle\n({scaffold})", color="#FF4B4B", shape="diamond", size=30)
-        net.add_node("CD40", label=f"CD40\n({ligand})", color="#1f77b4", size=25)
-        net.add_node("TRAF6", label="TRAF6", color="#ff7f0e")
-        net.add_node("NFkB", label="NF-κB", color="#2ca02c")
-        net.add_node("SOCS1", label="SOCS1", color="#8c564b")
-        net.add_node("TCell", label="T-Cell Response", color="#9467bd", shape="star", size=30)
-        net.add_edge("NP", "CD40", title="Scaffold-mediated clustering")
-        net.add_edge("CD40", "TRAF6", title=f"k1={k1:.2f}, k2={k2:.2f}")
-        net.add_edge("TRAF6", "NFkB", title=f"k3={k3:.2f}, k4={k4:.2f}")
-        net.add_edge("NFkB", "SOCS1", title=f"k7={k7:.2f}, k8={k8:.2f}")
-        net.add_edge("SOCS1", "TRAF6", title=f"inhibition k6={k6:.2f}")
-        net.add_edge("NFkB", "TCell", title="Effector activation")
-        net.toggle_physics(True)
-        net.save_graph("net.html")
-        with open("net.html", "r", encoding="utf-8") as f:
-            components.html(f.read(), height=530)
+        with instrumentation.phase(tab_select, "network"):
+            network_html = render_network_html(scaffold, ligand, k1, k2, k3, k4, k6, k7, k8)
+        with instrumentation.phase(tab_select, "render"):
+            components.html(network_html, height=530)
 
     with col2:
         st.metric("Clustering Regime", SCAFFOLD_MODELS[scaffold]["clustering"])
@@ -211,39 +392,8 @@ if tab_select == "Immunosome Builder":
 elif tab_select == "CRISPR Synergy":
     st.subheader("✂️ Dynamic CRISPR Synergy (AUC-based response ratio)")
 
-    t, _, nfkb_base, _ = simulate_signaling_ode(k1, k2, k3, k4, k6, k7, k8, cd40_input)
-    baseline_auc = float(np.trapezoid(nfkb_base, t))
-    baseline_t_peak = float(t[np.argmax(nfkb_base)])
-
-    rows = []
-    for target, effects in CRISPR_TARGET_EFFECTS.items():
-        k1_t = k1 * effects.get("k1_mult", 1.0)
-        k2_t = k2 * effects.get("k2_mult", 1.0)
-        k3_t = k3 * effects.get("k3_mult", 1.0)
-        k4_t = k4 * effects.get("k4_mult", 1.0)
-        k6_t = k6 * effects.get("k6_mult", 1.0)
-        k7_t = k7 * effects.get("k7_mult", 1.0)
-        k8_t = k8 * effects.get("k8_mult", 1.0)
-
-        t_ko, _, nfkb_ko, _ = simulate_signaling_ode(k1_t, k2_t, k3_t, k4_t, k6_t, k7_t, k8_t, cd40_input)
-        combo_auc = float(np.trapezoid(nfkb_ko, t_ko))
-        synergy = ((combo_auc - baseline_auc) / max(baseline_auc, 1e-6)) * 100.0
-        ko_t_peak = float(t_ko[np.argmax(nfkb_ko)])
-
-        rows.append(
-            {
-                "Target": target,
-                "Baseline AUC": round(baseline_auc, 3),
-                "KO+Agonist AUC": round(combo_auc, 3),
-                "Synergy Score (%)": round(synergy, 2),
-                "Baseline t_peak": round(baseline_t_peak, 2),
-                "KO t_peak": round(ko_t_peak, 2),
-                "Δt_peak": round(ko_t_peak - baseline_t_peak, 2),
-                "Mechanistic note": effects["note"],
-            }
-        )
-
-    score_df = pd.DataFrame(rows).sort_values("Synergy Score (%)", ascending=False)
+    with instrumentation.phase(tab_select, "compute"):
+        score_df = crispr_synergy_table(k1, k2, k3, k4, k6, k7, k8, cd40_input)
     selected = st.selectbox("Genetic Target", score_df["Target"].tolist())
 
     left, right = st.columns([1, 2])
@@ -252,58 +402,247 @@ elif tab_select == "CRISPR Synergy":
         st.metric(f"{selected} synergy", f"{row['Synergy Score (%)']}%")
         st.info(row["Mechanistic note"])
         st.caption("Score = ((KO+Agonist AUC - Baseline AUC) / Baseline AUC) × 100")
-        st.caption("Time-to-peak is computed as t[np.argmax(NF-κB)] to capture dynamic reshaping.")
+        st.caption("Time-to-peak is located where dNF-κB/dt changes sign, on the adaptive (Dormand–Prince) solver's dense output.")
 
-    with right:
+    with right, instrumentation.phase(tab_select, "render"):
         st.bar_chart(score_df.set_index("Target")[["Synergy Score (%)"]])
         st.dataframe(
             score_df[["Target", "Baseline AUC", "KO+Agonist AUC", "Synergy Score (%)", "Baseline t_peak", "KO t_peak", "Δt_peak"]],
             width="stretch",
         )
 
-elif tab_select == "Kinetic Simulator (ODE)":
-    st.subheader("📈 ODE Kinetic Simulator")
-    t, traf6, nfkb, socs1 = simulate_signaling_ode(k1, k2, k3, k4, k6, k7, k8, cd40_input)
-    kinetics_df = pd.DataFrame({"Time": t, "TRAF6": traf6, "NF-κB": nfkb, "SOCS1": socs1})
-    st.line_chart(kinetics_df.set_index("Time"))
-
-    analytical_nfkb_linear = (k1 * k3 * cd40_input) / max(k2 * k4, 1e-9)
-    simulated_nfkb = float(nfkb[-1])
-    percent_deviation = abs((simulated_nfkb - analytical_nfkb_linear) / max(analytical_nfkb_linear, 1e-9)) * 100
-    convergence_difference = abs(float(nfkb[-1]) - float(nfkb[-10]))
-
-    st.success(f"Steady-state NF-κB (simulated): {simulated_nfkb:.3f}")
+    st.divider()
+    st.subheader("🧬 Combinatorial Screen")
+    st.caption(
+        "Multi-gene knockouts multiply their single-target rate multipliers. Upload a library CSV with a `target` column, "
+        "any of `k1_mult` … `k8_mult` and an optional `note`, or screen the built-in targets."
+    )
+    library_file = st.file_uploader("Target library (CSV)", type=["csv"])
+    try:
+        library = load_target_library(library_file) if library_file is not None else CRISPR_TARGET_EFFECTS
+    except ValueError as exc:
+        st.error(str(exc))
+        library = CRISPR_TARGET_EFFECTS
+
+    scol1, scol2, scol3 = st.columns(3)
+    with scol1:
+        screen_sizes = st.multiselect(
+            "Knockouts per combination", [size for size in (1, 2, 3) if size <= len(library)], default=[2]
+        )
+    with scol2:
+        screen_top_k = st.number_input("Top-k", min_value=1, max_value=1000, value=25, step=5)
+    with scol3:
+        screen_rank = st.selectbox("Rank by", ["Synergy Score (%)", "Δt_peak"])
+
+    n_combinations = sum(comb(len(library), size) for size in screen_sizes)
+    st.caption(f"{len(library)} targets → {n_combinations:,} combinations (adaptive Dormand–Prince solver, batched).")
+
+    if st.button("Run Screen", disabled=not screen_sizes):
+        progress_bar = st.progress(0.0, text="Screening…")
+        with instrumentation.phase(tab_select, "screen"):
+            st.session_state.screen_results = run_combinatorial_screen(
+                k1, k2, k3, k4, k6, k7, k8, cd40_input,
+                effects=library,
+                sizes=tuple(screen_sizes),
+                top_k=int(screen_top_k),
+                rank_by="synergy" if screen_rank.startswith("Synergy") else "delta_t_peak",
+                progress=lambda done, total: progress_bar.progress(done / total, text=f"Screened {done:,}/{total:,}"),
+            )
+        progress_bar.empty()
 
-    st.markdown("### Sensitivity Analysis: k1 Sweep")
-    k1_values = np.linspace(0.02, 0.18, 15)
-    sweep_results = []
-    for val in k1_values:
-        _, _, nfkb_sweep, _ = simulate_signaling_ode(val, k2, k3, k4, k6, k7, k8, cd40_input)
-        sweep_results.append(float(nfkb_sweep[-1]))
+    hits = st.session_state.screen_results
+    if hits is not None:
+        st.markdown(
+            f"Top {len(hits)} of {hits.attrs['combinations']:,} combinations · baseline AUC "
+            f"{hits.attrs['baseline_auc']:.3f}, t_peak {hits.attrs['baseline_t_peak']:.2f}"
+        )
+        with instrumentation.phase(tab_select, "render"):
+            st.dataframe(hits, width="stretch")
+            st.download_button("Download hits (CSV)", hits.to_csv(index=False), file_name="crispr_screen_hits.csv", mime="text/csv")
+        st.caption("Epistasis = combination synergy − sum of the members' single-knockout synergies.")
 
-    sweep_df = pd.DataFrame({"k1": k1_values, "SteadyState_NFkB": sweep_results})
-    st.line_chart(sweep_df.set_index("k1"))
+elif tab_select == "Kinetic Simulator (ODE)":
+    st.subheader("📈 ODE Kinetic Simulator")
+    served = surrogate_mode and render_surrogate_panel(tab_select, k1, k2, k3, k4, k6, k7, k8, cd40_input)
+    show_exact = not served or st.checkbox(
+        "Run the exact solves (trajectory, steady state, sweeps)", value=False,
+        help="The metrics above came from the surrogate table; tick to integrate the model for the full trajectory.",
+    )
+    if show_exact:
+        with instrumentation.phase(tab_select, "compute"):
+            t, traf6, nfkb, socs1 = cached_simulate_signaling_ode(k1, k2, k3, k4, k6, k7, k8, cd40_input)
+            _, nfkb_ss, _, ss_converged = solve_steady_state(k1, k2, k3, k4, k6, k7, k8, cd40_input)
+            events = solve_signaling_adaptive(k1, k2, k3, k4, k6, k7, k8, cd40_input)
+            k1_values = np.linspace(0.02, 0.18, 200)
+            _, sweep_results, _, _ = solve_steady_state(k1_values, k2, k3, k4, k6, k7, k8, cd40_input)
+            k4_values = np.linspace(0.02, 0.18, 200)
+            _, results_k4, _, _ = solve_steady_state(k1, k2, k3, k4_values, k6, k7, k8, cd40_input)
+
+        with instrumentation.phase(tab_select, "dataframe"):
+            kinetics_df = pd.DataFrame({"Time": t, "TRAF6": traf6, "NF-κB": nfkb, "SOCS1": socs1}).set_index("Time")
+            sweep_df = pd.DataFrame({"k1": k1_values, "SteadyState_NFkB": sweep_results}).set_index("k1")
+            k4_df = pd.DataFrame({"k4": k4_values, "SteadyState_NFkB": results_k4}).set_index("k4")
+
+        with instrumentation.phase(tab_select, "render"):
+            st.line_chart(kinetics_df)
+
+        analytical_nfkb_linear = (k1 * k3 * cd40_input) / max(k2 * k4, 1e-9)
+        simulated_nfkb = float(nfkb_ss[0])
+        percent_deviation = abs((simulated_nfkb - analytical_nfkb_linear) / max(analytical_nfkb_linear, 1e-9)) * 100
+        convergence_difference = abs(float(nfkb[-1]) - float(nfkb[-10]))
+        trajectory_gap = abs(float(nfkb[-1]) - simulated_nfkb)
+
+        if ss_converged[0]:
+            st.success(f"Steady-state NF-κB (simulated): {simulated_nfkb:.3f}")
+        else:
+            st.warning(f"NF-κB did not settle to a steady state (last value {simulated_nfkb:.3f}); the SOCS1 loop may be oscillating.")
 
-    st.markdown("### Sensitivity Analysis: k4 Sweep")
-    k4_values = np.linspace(0.02, 0.18, 15)
-    results_k4 = []
-    for val in k4_values:
-        _, _, nfkb_k4, _ = simulate_signaling_ode(k1, k2, k3, val, k6, k7, k8, cd40_input)
-        results_k4.append(float(nfkb_k4[-1]))
+        with instrumentation.phase(tab_select, "render"):
+            st.markdown("### Sensitivity Analysis: k1 Sweep")
+            st.line_chart(sweep_df)
 
-    k4_df = pd.DataFrame({"k4": k4_values, "SteadyState_NFkB": results_k4})
-    st.line_chart(k4_df.set_index("k4"))
+            st.markdown("### Sensitivity Analysis: k4 Sweep")
+            st.line_chart(k4_df)
 
-    st.markdown("**Solved numerically as coupled ODEs using RK4 integration (t_max=200, points=2000).**")
+        st.markdown("**Solved numerically as coupled ODEs using RK4 integration (t_max=200, points=2000).**")
+        st.caption("Steady states and sweeps use the closed-form fixed point, falling back to RK4 integration until convergence.")
 
-    st.code(
-        f"""Analytical NF-κB* (linear, no SOCS1 loop): {analytical_nfkb_linear:.3f}
+        st.code(
+            f"""Analytical NF-κB* (linear, no SOCS1 loop): {analytical_nfkb_linear:.3f}
 Simulated NF-κB (SOCS1-coupled): {simulated_nfkb:.3f}
 Percent deviation: {percent_deviation:.2f}%
+Fixed-point solve converged: {"yes" if ss_converged[0] else "no"}
+Trajectory gap to steady state at t=200: {trajectory_gap:.4f}
+Adaptive NF-κB peak: {events["peak"][0]:.4f} at t={events["t_peak"][0]:.3f} ({events["steps"][0]} Dormand–Prince steps)
+Steady state reached (adaptive event): {"t=" + format(events["t_steady"][0], ".1f") if np.isfinite(events["t_steady"][0]) else "not within t=200"}
 Convergence difference (last 10 steps): {convergence_difference:.4f}""",
-        language="text",
+            language="text",
+        )
+        st.caption("*Analytical value shown is linear approximation NF-κB_ss = (k1·k3·CD40)/(k2·k4).")
+
+    st.divider()
+    st.markdown("### Calibrate to Time-Course Data")
+    st.caption(
+        "CSV with a `time` column, measured `nfkb` (optionally `traf6` / `socs1`), and optional `sample` and "
+        "`cd40_input` columns. Rate constants are fitted within the slider ranges by multi-start least squares "
+        "with forward-sensitivity gradients; the current sidebar values seed the first start."
     )
-    st.caption("*Analytical value shown is linear approximation NF-κB_ss = (k1·k3·CD40)/(k2·k4).")
+    data_file = st.file_uploader("Time courses (CSV)", type=["csv"])
+    fcol1, fcol2 = st.columns(2)
+    with fcol1:
+        fit_starts = st.number_input("Starts per sample", min_value=1, max_value=64, value=8, step=1)
+    with fcol2:
+        fit_seed = st.number_input("Start seed", min_value=0, value=11, step=1)
+
+    if st.button("Fit Rate Constants", disabled=data_file is None):
+        try:
+            samples = load_time_courses(data_file)
+        except ValueError as exc:
+            st.error(str(exc))
+        else:
+            progress_bar = st.progress(0.0, text="Fitting…")
+            with instrumentation.phase(tab_select, "fit"):
+                fits = fit_time_courses(
+                    samples,
+                    n_starts=int(fit_starts),
+                    seed=int(fit_seed),
+                    initial=[k1, k2, k3, k4, k6, k7, k8],
+                    progress=lambda done, total: progress_bar.progress(done / total, text=f"Fitted {done}/{total} samples"),
+                )
+            progress_bar.empty()
+            st.session_state.fit_results = {"fits": fits, "samples": samples}
+
+    fit_state = st.session_state.fit_results
+    if fit_state is not None:
+        fits = fit_state["fits"]
+        st.dataframe(fits, width="stretch")
+        fitted_sample = st.selectbox("Sample", fits["sample"].tolist())
+        fit_row = fits[fits["sample"] == fitted_sample].iloc[0]
+        observed = fit_state["samples"][fitted_sample]
+        t_fit, traf6_fit, nfkb_fit, socs1_fit = cached_simulate_signaling_ode(
+            *(float(fit_row[name]) for name in RATE_CONSTANTS), float(fit_row["cd40_input"]),
+            t_max=float(observed["t"].max()),
+        )
+        fitted_curves = {"traf6": traf6_fit, "nfkb": nfkb_fit, "socs1": socs1_fit}
+        overlay = pd.DataFrame({"Time": t_fit})
+        for name, values in observed["observed"].items():
+            overlay[f"{name} (fit)"] = fitted_curves[name]
+            measured = np.isfinite(values)
+            overlay[f"{name} (data)"] = np.interp(t_fit, observed["t"][measured], values[measured], left=np.nan, right=np.nan)
+        st.line_chart(overlay.set_index("Time"))
+        st.caption(f"RMSE (scaled): {fit_row['rmse']:.4f} · converged: {'yes' if fit_row['converged'] else 'no'}")
+
+elif tab_select == "Global Sensitivity":
+    st.subheader("🌐 Global Sensitivity Analysis")
+    st.caption("All seven rate constants are sampled over their sidebar slider ranges; CD40 input is held at the current level.")
+
+    gcol1, gcol2, gcol3 = st.columns(3)
+    with gcol1:
+        gsa_method = st.selectbox("Method", ["Sobol (Saltelli)", "Morris screening"])
+    with gcol2:
+        gsa_samples = st.select_slider(
+            "Base samples / trajectories", options=[64, 128, 256, 512, 1024, 2048, 4096], value=512
+        )
+    with gcol3:
+        gsa_seed = st.number_input("Design seed", min_value=0, value=7, step=1)
+
+    method_key = "sobol" if gsa_method.startswith("Sobol") else "morris"
+    n_evals = gsa_samples * (len(RATE_CONSTANTS) + (2 if method_key == "sobol" else 1))
+    st.caption(f"This design needs {n_evals:,} model evaluations (adaptive Dormand–Prince solver, batched).")
+
+    if st.button("Run Sensitivity Analysis"):
+        submit_background_job(
+            "gsa_job", "gsa_results", "global_sensitivity", global_sensitivity_stored,
+            method=method_key, n_samples=int(gsa_samples), cd40_input=cd40_input, seed=int(gsa_seed),
+        )
+
+    if st.session_state.gsa_job is not None:
+        background_job_panel("gsa_job", "gsa_results", "Sensitivity analysis", "evaluations")
+    gsa = st.session_state.gsa_results
+    if gsa is not None:
+        metric = st.selectbox("Output", list(RESPONSE_METRICS))
+        result = gsa["indices"][metric]
+        st.markdown(f"**{gsa['method'].title()}** over {gsa['evaluations']:,} evaluations — output: `{metric}`")
+        if gsa.get("nonfinite"):
+            st.warning(
+                f"{gsa['nonfinite']:,} evaluations returned a non-finite metric; "
+                f"{int(result['dropped']):,} {'base samples' if gsa['method'] == 'sobol' else 'trajectories'} "
+                "containing them were left out of these indices."
+            )
+        if gsa["method"] == "sobol":
+            gsa_df = pd.DataFrame(
+                {
+                    "Parameter": gsa["names"],
+                    "S1": result["S1"],
+                    "S1 95% CI": [f"[{lo:.3f}, {hi:.3f}]" for lo, hi in zip(result["S1_low"], result["S1_high"])],
+                    "ST": result["ST"],
+                    "ST 95% CI": [f"[{lo:.3f}, {hi:.3f}]" for lo, hi in zip(result["ST_low"], result["ST_high"])],
+                }
+            )
+            st.bar_chart(gsa_df.set_index("Parameter")[["S1", "ST"]], stack=False)
+            st.caption("S1 = first-order (Saltelli 2010) · ST = total-order (Jansen) · CIs from bootstrap resampling.")
+        else:
+            gsa_df = pd.DataFrame(
+                {
+                    "Parameter": gsa["names"],
+                    "μ*": result["mu_star"],
+                    "μ* 95% CI": [f"[{lo:.3f}, {hi:.3f}]" for lo, hi in zip(result["mu_star_low"], result["mu_star_high"])],
+                    "μ": result["mu"],
+                    "σ": result["sigma"],
+                }
+            )
+            st.bar_chart(gsa_df.set_index("Parameter")[["μ*", "σ"]], stack=False)
+            st.caption("μ* ranks overall influence; large σ relative to μ* indicates non-linearity or interactions.")
+        st.dataframe(gsa_df, width="stretch")
+        stored_gsa = get_result_store().open(gsa["store_key"]) if "store_key" in gsa else None
+        if stored_gsa is not None:
+            archive_download_button(
+                stored_gsa,
+                "⬇️ Download design and outputs (.zip of .npy arrays)",
+                f"cd40_sensitivity_{stored_gsa.key}.zip",
+            )
+    elif st.session_state.gsa_job is None:
+        st.warning("Click the button to run the sensitivity analysis.")
 
 elif tab_select == "Model Validation (Robustness)":
     st.subheader("🧪 Model Validation & Stress Testing")
@@ -313,75 +652,129 @@ elif tab_select == "Model Validation (Robustness)":
     with col_left:
         st.markdown("#### 1. Null Model Comparison")
         st.caption("Comparing the system with and without SOCS1-mediated negative feedback.")
-        comp_df = run_null_model_comparison(k1, k2, k3, k4, k6, k7, k8, cd40_input)
-        st.line_chart(comp_df.set_index("Time"))
+        with instrumentation.phase(tab_select, "compute"):
+            comp_df = run_null_model_comparison(
+                k1, k2, k3, k4, k6, k7, k8, cd40_input, solver=cached_simulate_signaling_ode_batch
+            )
+        with instrumentation.phase(tab_select, "render"):
+            st.line_chart(comp_df.set_index("Time"))
         st.info("Notice: Without feedback (Null Model), NF-κB fails to attenuate, representing a state of chronic inflammation.")
 
     with col_right:
-        st.markdown("#### 2. Monte Carlo Robustness (n=50)")
+        mc_iterations = st.number_input("Monte Carlo iterations", min_value=10, max_value=1_000_000, value=50, step=50)
+        st.markdown(f"#### 2. Monte Carlo Robustness (n={int(mc_iterations)})")
         st.caption("Testing model stability under +/- 20% parameter stochasticity.")
         mc_seed = st.number_input("Monte Carlo seed (optional)", min_value=0, value=42, step=1)
         if st.button("Run Monte Carlo Stress Test"):
-            t_mc, results_mc = run_monte_carlo(k1, k2, k3, k4, k6, k7, k8, cd40_input, points=800, seed=int(mc_seed))
-            st.session_state.mc_results = (t_mc, results_mc)
-
-        if st.session_state.mc_results is not None:
-            t_mc, results_mc = st.session_state.mc_results
-            t_plot = t_mc[::5]
-            results_plot = results_mc[:, ::5]
-            mean = results_plot.mean(axis=0)
-            std = results_plot.std(axis=0)
-            mc_plot_df = pd.DataFrame(
-                {
-                    "Mean Response": mean,
-                    "Upper (+1σ)": mean + std,
-                    "Lower (-1σ)": mean - std,
-                },
-                index=t_plot,
-            )
-            st.line_chart(mc_plot_df, width="stretch")
-            st.caption("Monte Carlo uses 800 solver points and plotting is downsampled by 5× for faster rendering.")
-
-            show_raw = st.checkbox(
-                "Show all Monte Carlo trajectories (may slow rendering)",
-                value=False,
-            )
-
-            if show_raw:
-                st.markdown("### Raw Monte Carlo Trajectories")
-                t_raw = t_mc[::5]
-                results_raw = results_mc[:, ::5]
-                raw_df = pd.DataFrame(results_raw.T, index=t_raw)
-                st.line_chart(raw_df, width="stretch")
-
-            st.markdown("#### 3. Monte Carlo Summary Metrics")
-            peak_values = np.max(results_mc, axis=1)
-            peak_times = t_mc[np.argmax(results_mc, axis=1)]
-            mean_peak = np.mean(peak_values)
-            std_peak = np.std(peak_values)
-            mean_tpeak = np.mean(peak_times)
-            std_tpeak = np.std(peak_times)
-
-            mcol1, mcol2 = st.columns(2)
-            with mcol1:
-                st.metric("Mean Peak NF-κB", f"{mean_peak:.3f}")
-                st.caption(f"Std Dev: ±{std_peak:.3f}")
-            with mcol2:
-                st.metric("Mean Time-to-Peak", f"{mean_tpeak:.2f}")
-                st.caption(f"Std Dev: ±{std_tpeak:.2f}")
-
-            auc_values = np.trapezoid(results_mc, t_mc, axis=1)
-            hist_counts, hist_edges = np.histogram(auc_values, bins=20)
-            hist_centers = np.round((hist_edges[:-1] + hist_edges[1:]) / 2, 2)
-            auc_hist_df = pd.DataFrame({"Frequency": hist_counts}, index=hist_centers)
-            auc_hist_df.index.name = "AUC Bin Center"
-            st.bar_chart(auc_hist_df, width="stretch")
-            st.caption(f"AUC Mean: {np.mean(auc_values):.2f} | Std Dev: ±{np.std(auc_values):.2f}")
+            with instrumentation.phase(tab_select, "compute"):
+                if mc_iterations <= MC_RAW_TRAJECTORY_LIMIT:
+                    t_mc, results_mc, rates_mc = run_monte_carlo(
+                        k1, k2, k3, k4, k6, k7, k8, cd40_input, iterations=int(mc_iterations), points=800,
+                        seed=int(mc_seed), return_rates=True,
+                    )
+                    summary = summarize_monte_carlo(t_mc, results_mc, rates=rates_mc, cd40_input=cd40_input)
+                    summary["trajectories"] = results_mc
+                    st.session_state.mc_results = summary
+                    release_background_job("mc_job")
+                else:
+                    # Large runs stream in the background; identical runs from other sessions are shared.
+                    submit_background_job(
+                        "mc_job", "mc_results", "monte_carlo", iter_monte_carlo_stored,
+                        k1, k2, k3, k4, k6, k7, k8, cd40_input, iterations=int(mc_iterations), points=800, seed=int(mc_seed),
+                    )
+
+        if st.session_state.mc_job is not None:
+            background_job_panel("mc_job", "mc_results", "Monte Carlo", "iterations", render_monte_carlo_summary)
+        elif st.session_state.mc_results is not None:
+            summary = st.session_state.mc_results
+            t_mc = summary["t"]
+            with instrumentation.phase(tab_select, "render"):
+                render_monte_carlo_summary(summary)
+
+            if "trajectories" in summary:
+                show_raw = st.checkbox(
+                    "Show all Monte Carlo trajectories (may slow rendering)",
+                    value=False,
+                )
+
+                if show_raw:
+                    st.markdown("### Raw Monte Carlo Trajectories")
+                    t_raw = t_mc[::5]
+                    results_raw = summary["trajectories"][:, ::5]
+                    raw_df = pd.DataFrame(results_raw.T, index=t_raw)
+                    st.line_chart(raw_df, width="stretch")
+            elif (stored_mc := get_result_store().open(summary["store_key"])) is not None:
+                st.caption(
+                    f"Runs above {MC_RAW_TRAJECTORY_LIMIT} iterations are reduced in parallel and every trajectory is kept "
+                    f"on disk (float32, {stored_mc.nbytes / 1e6:,.1f} MB); reruns with the same settings reload instantly."
+                )
+                if st.checkbox(f"Show the first {MC_RAW_TRAJECTORY_LIMIT} stored trajectories", value=False):
+                    st.markdown("### Raw Monte Carlo Trajectories")
+                    raw_df = pd.DataFrame(stored_mc["nfkb"][:MC_RAW_TRAJECTORY_LIMIT, ::5].T, index=t_mc[::5])
+                    st.line_chart(raw_df, width="stretch")
+                archive_download_button(
+                    stored_mc,
+                    "⬇️ Download all runs (.zip of .npy arrays)",
+                    f"cd40_monte_carlo_{stored_mc.key}.zip",
+                )
+            else:
+                st.caption("The stored runs of this ensemble have been evicted from the result store.")
 
             st.success("Robustness Confirmed: System maintains transient peak despite parameter variance.")
         else:
             st.warning("Click the button to run the stochastic simulation.")
 
+    with st.expander("💾 Stored Monte Carlo ensembles"):
+        stored_runs = get_result_store().list(kind="monte_carlo")
+        if stored_runs:
+            run_labels = {
+                meta["key"]: (
+                    f"n={meta['settings']['iterations']:,} · seed={meta['settings']['seed']} · "
+                    f"k1={meta['settings']['k1']:.3f} … k8={meta['settings']['k8']:.3f} · CD40={meta['settings']['cd40_input']:.2f} · "
+                    f"{meta['nbytes'] / 1e6:,.1f} MB"
+                )
+                for meta in stored_runs
+            }
+            chosen_run = st.selectbox("Ensemble", list(run_labels), format_func=run_labels.get)
+            if st.button("Load ensemble"):
+                loaded = get_result_store().open(chosen_run)
+                if loaded is not None:
+                    release_background_job("mc_job")
+                    st.session_state.mc_results = {**loaded.summary(), "store_key": chosen_run}
+                    st.rerun()
+        else:
+            st.caption(f"Monte Carlo runs above {MC_RAW_TRAJECTORY_LIMIT} iterations are stored here automatically.")
+
+    st.divider()
+    st.markdown("### 🎲 Intrinsic Noise: Single-Cell Stochastic Simulation")
+    st.caption(
+        "Every cell shares the current parameters; noise comes from finite molecule numbers. Smaller system sizes Ω "
+        "(molecules per concentration unit) or lower CD40 input mean fewer molecules and larger cell-to-cell variability."
+    )
+    ncol_a, ncol_b, ncol_c, ncol_d = st.columns(4)
+    with ncol_a:
+        noise_volume = st.select_slider("System size Ω", options=[5, 10, 20, 50, 100, 200, 500, 1000], value=50)
+    with ncol_b:
+        noise_cells = st.number_input("Cells", min_value=100, max_value=100_000, value=10_000, step=1000)
+    with ncol_c:
+        noise_method = st.selectbox(
+            "Method", STOCHASTIC_METHODS,
+            format_func={"auto": "Auto (SSA when small)", "ssa": "Exact SSA", "tau_leap": "Tau-leaping"}.get,
+        )
+    with ncol_d:
+        noise_seed = st.number_input("Seed", min_value=0, value=7, step=1)
+    if st.button("Run stochastic ensemble"):
+        submit_background_job(
+            "noise_job", "noise_results", "stochastic", run_stochastic_ensemble,
+            k1, k2, k3, k4, k6, k7, k8, cd40_input, volume=float(noise_volume), cells=int(noise_cells),
+            method=noise_method, seed=int(noise_seed),
+        )
+    if st.session_state.noise_job is not None:
+        background_job_panel("noise_job", "noise_results", "Stochastic ensemble", "cells")
+    elif st.session_state.noise_results is not None:
+        with instrumentation.phase(tab_select, "render"):
+            render_stochastic_ensemble(st.session_state.noise_results)
+
     st.divider()
     st.markdown("### 📊 Parameter Justification & Sensitivity")
     st.write("Parameters are derived as dimensionless ratios to maintain biological scaling consistent with in vitro CD40 activation kinetics.")
@@ -466,3 +859,26 @@ st.download_button(
 
 st.divider()
 st.caption("PhD Application Portfolio | Systems Biology Framework | Yashwant Nama")
+
+perf_rerun = instrumentation.finish_rerun()
+if perf_rerun is not None:
+    instrumentation.export_from_env()
+    if show_perf_panel:
+        with st.sidebar.expander("⏱ Performance (this rerun)", expanded=True):
+            st.metric("Traced rerun time", f"{perf_rerun.elapsed * 1e3:.1f} ms")
+            if perf_rerun.phases:
+                phase_df = pd.DataFrame(perf_rerun.phases, columns=["Tab", "Phase", "Seconds"])
+                phase_df["ms"] = (phase_df.pop("Seconds") * 1e3).round(2)
+                st.dataframe(phase_df[["Phase", "ms"]], width="stretch", hide_index=True)
+            solver_df = pd.DataFrame(
+                {"Solves": perf_rerun.solves, "Member-steps": perf_rerun.steps}
+            ).fillna(0).astype(int)
+            if solver_df.empty:
+                st.caption("No ODE solves this rerun (all results served from cache).")
+            else:
+                st.dataframe(solver_df, width="stretch")
+            for cache_name, stats in instrumentation.cache_stats().items():
+                st.caption(
+                    f"{cache_name.title()} cache: {stats['hits']} hits / {stats['misses']} misses "
+                    f"({stats['hit_rate']:.0%}), {stats['entries']} entries, {stats['bytes'] / 1e6:.1f} MB"
+                )
@@ -0,0 +1,291 @@
+"""Benchmark and regression gate for the solver and analysis paths.
+
+Times each case (best of ``--repeat`` runs), measures its peak Python heap
+with tracemalloc in a separate run, and appends the results to a JSON
+history. The run fails (exit code 1) if any case is slower or heavier than
+the median of the previous ``--window`` recorded runs by more than
+``--threshold``. It also fails if the default-grid NF-κB curves drift from
+a high-resolution reference trajectory by more than ``--accuracy-tol``.
+
+    python benchmarks/run_benchmarks.py                  # run, compare, record
+    python benchmarks/run_benchmarks.py --only ode --no-record
+"""
+
+import argparse
+import datetime
+import functools
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cd40_immunosome import (  # noqa: E402
+    CD40_NETWORK,
+    RATE_CONSTANTS,
+    ResultStore,
+    build_surrogate,
+    crispr_synergy_table,
+    run_combinatorial_screen,
+    run_monte_carlo,
+    run_monte_carlo_streaming,
+    run_null_model_comparison,
+    run_stochastic_ensemble,
+    simulate_network_batch,
+    simulate_network_stiff,
+    simulate_signaling_ode,
+    simulate_signaling_ode_batch,
+    solve_signaling_adaptive,
+    solve_steady_state,
+)
+
+DEFAULT_PARAMS = (0.08, 0.06, 0.1, 0.05, 0.05, 0.05, 0.1, 1.0)
+
+# Default slider state plus two corners with strong SOCS1 feedback.
+ACCURACY_PARAMS = {
+    "default": DEFAULT_PARAMS,
+    "strong_feedback": (0.2, 0.01, 0.25, 0.01, 0.5, 0.5, 0.05, 2.0),
+    "fast_rates": (0.2, 0.2, 0.25, 0.2, 0.5, 0.5, 0.5, 2.0),
+}
+
+REFERENCE_REFINEMENT = 20
+
+# Differences smaller than this are timer/allocator noise and never count as regressions.
+NOISE_FLOOR = {"wall_s": 1e-3, "peak_mb": 0.5}
+DEFAULT_HISTORY = Path(__file__).resolve().parent / "history.json"
+
+
+def _synthetic_library(n_targets, seed=0):
+    """Seeded library of knockouts each scaling two random rate constants by 0.6–1.3×."""
+    rng = np.random.default_rng(seed)
+    library = {}
+    for i in range(n_targets):
+        chosen = rng.choice(len(RATE_CONSTANTS), size=2, replace=False)
+        library[f"G{i:03d}"] = {f"{RATE_CONSTANTS[j]}_mult": float(rng.uniform(0.6, 1.3)) for j in chosen}
+    return library
+
+
+@functools.cache
+def _benchmark_surrogate(store_dir):
+    """Coarse 3^8 response table in the throwaway ``store_dir``, built on first use (so only the first repeat pays for it)."""
+    return build_surrogate(nodes=3, validation=0, workers=1, store=ResultStore(store_dir))
+
+
+def _cases(store_dir):
+    """(name, callable, model solves per call). Every callable is self-contained; stored results go to ``store_dir``."""
+    k1, k2, k3, k4, k6, k7, k8, cd40 = DEFAULT_PARAMS
+    cases = []
+    for points in (500, 2000, 8000):
+        cases.append((f"ode.single.points={points}", lambda p=points: simulate_signaling_ode(*DEFAULT_PARAMS, points=p), 1))
+    for n in (100, 1000):
+        k1_values = np.linspace(0.02, 0.18, n)
+        cases.append(
+            (f"ode.batch.n={n}", lambda v=k1_values: simulate_signaling_ode_batch(v, k2, k3, k4, k6, k7, k8, cd40), n)
+        )
+    for n in (1, 1000):
+        k1_values = np.linspace(0.02, 0.18, n)
+        cases.append(
+            (f"ode.adaptive.n={n}", lambda v=k1_values: solve_signaling_adaptive(v, k2, k3, k4, k6, k7, k8, cd40), n)
+        )
+    network_params = {**dict(zip(RATE_CONSTANTS, DEFAULT_PARAMS[:7])), "k1": np.linspace(0.02, 0.18, 1000), "cd40_input": cd40}
+    cases.append(("ode.network.rk4.n=1000", lambda: simulate_network_batch(CD40_NETWORK, network_params), 1000))
+    cases.append(
+        (
+            "ode.network.ros2.points=201.n=1000",
+            lambda: simulate_network_stiff(CD40_NETWORK, network_params, points=201),
+            1000,
+        )
+    )
+    for iterations in (50, 500):
+        cases.append(
+            (
+                f"montecarlo.stored.n={iterations}",
+                lambda i=iterations: run_monte_carlo(*DEFAULT_PARAMS, iterations=i, seed=42),
+                iterations,
+            )
+        )
+    cases.append(
+        (
+            "montecarlo.streaming.n=10000",
+            lambda: run_monte_carlo_streaming(*DEFAULT_PARAMS, iterations=10_000, seed=42, workers=1),
+            10_000,
+        )
+    )
+    for method, volume in (("ssa", 10), ("tau_leap", 100)):
+        cases.append(
+            (
+                f"stochastic.{method}.volume={volume}.cells=10000",
+                lambda m=method, v=volume: run_stochastic_ensemble(*DEFAULT_PARAMS, volume=v, method=m, seed=42, workers=1),
+                10_000,
+            )
+        )
+    cases.append(("surrogate.evaluate.n=1", lambda: _benchmark_surrogate(store_dir).evaluate(DEFAULT_PARAMS), 1))
+    cases.append(("surrogate.phase_diagram.resolution=61", lambda: _benchmark_surrogate(store_dir).phase_diagram(*DEFAULT_PARAMS), 61 * 61))
+    cases.append(("null_model", lambda: run_null_model_comparison(*DEFAULT_PARAMS), 2))
+    cases.append(("crispr.synergy_table", lambda: crispr_synergy_table(*DEFAULT_PARAMS), 5))
+    library = _synthetic_library(100)
+    cases.append(
+        (
+            "crispr.screen.pairs.targets=100",
+            lambda: run_combinatorial_screen(*DEFAULT_PARAMS, effects=library, sizes=(2,), workers=1),
+            101 + 4950,
+        )
+    )
+
+    sweep_values = np.linspace(0.02, 0.18, 15)
+    cases.append(
+        (
+            "sweep.k1.rk4.n=15",
+            lambda: simulate_signaling_ode_batch(sweep_values, k2, k3, k4, k6, k7, k8, cd40)[2][:, -1],
+            15,
+        )
+    )
+    dense_values = np.linspace(0.02, 0.18, 1000)
+    cases.append(
+        ("sweep.k1.steady_state.n=1000", lambda: solve_steady_state(dense_values, k2, k3, k4, k6, k7, k8, cd40), 1000)
+    )
+    return cases
+
+
+def time_case(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def peak_memory_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1e6
+
+
+def check_accuracy(tol):
+    """Max |ΔNF-κB| / max|NF-κB| of the default grid against a refined RK4 reference."""
+    report = {}
+    for label, params in ACCURACY_PARAMS.items():
+        t, _, nfkb, _ = simulate_signaling_ode(*params)
+        points_ref = (len(t) - 1) * REFERENCE_REFINEMENT + 1
+        _, _, nfkb_ref, _ = simulate_signaling_ode(*params, points=points_ref)
+        peak_ref = float(nfkb_ref.max())
+        nfkb_ref = nfkb_ref[::REFERENCE_REFINEMENT]
+        _, _, nfkb_batch, _ = simulate_signaling_ode_batch(*params)
+        adaptive_peak = solve_signaling_adaptive(*params)["peak"][0]
+        _, network_states = simulate_network_batch(
+            CD40_NETWORK, dict(zip((*RATE_CONSTANTS, "cd40_input"), params))
+        )
+        scale = max(float(np.abs(nfkb_ref).max()), 1e-12)
+        report[label] = {
+            "single_rel_error": float(np.abs(nfkb - nfkb_ref).max() / scale),
+            "batch_rel_error": float(np.abs(nfkb_batch[0] - nfkb_ref).max() / scale),
+            "adaptive_peak_rel_error": float(abs(adaptive_peak - peak_ref) / scale),
+            "network_rel_error": float(np.abs(network_states[:, 1, 0] - nfkb_ref).max() / scale),
+        }
+    failures = [
+        f"{label}.{kind}={value:.2e}" for label, errors in report.items() for kind, value in errors.items() if not value <= tol
+    ]
+    return report, failures
+
+
+def load_history(path):
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_regressions(results, history, threshold, window):
+    """Compare against the median of the last ``window`` runs that measured the same case."""
+    regressions = []
+    for name, current in results.items():
+        previous = [run["results"][name] for run in history if name in run.get("results", {})][-window:]
+        if not previous:
+            continue
+        for metric in ("wall_s", "peak_mb"):
+            baseline = float(np.median([entry[metric] for entry in previous]))
+            grew_by = current[metric] - baseline
+            if grew_by > NOISE_FLOOR[metric] and grew_by > baseline * threshold:
+                regressions.append(f"{name}: {metric} {current[metric]:.4g} vs median {baseline:.4g} (+{current[metric] / baseline - 1:.0%})")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=Path, default=DEFAULT_HISTORY, help="JSON history file (default: benchmarks/history.json).")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown / memory growth vs. history (default: 0.25).")
+    parser.add_argument("--window", type=int, default=5, help="Number of previous runs forming the baseline median (default: 5).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per case; the best is kept (default: 3).")
+    parser.add_argument("--accuracy-tol", type=float, default=1e-6, help="Max relative NF-κB error vs. reference (default: 1e-6).")
+    parser.add_argument("--only", action="append", default=[], help="Run only cases whose name contains this substring; repeatable.")
+    parser.add_argument("--no-record", action="store_true", help="Do not append this run to the history.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="cd40_bench_") as store_dir:
+        for name, fn, solves in _cases(store_dir):
+            if args.only and not any(part in name for part in args.only):
+                continue
+            fn()  # warm-up: imports, allocator, caches
+            wall = time_case(fn, args.repeat)
+            peak = peak_memory_mb(fn)
+            results[name] = {"wall_s": wall, "peak_mb": peak, "solves_per_s": solves / wall if wall > 0 else float("inf")}
+            print(f"{name:<36} {wall * 1e3:10.2f} ms {peak:10.2f} MB {results[name]['solves_per_s']:14,.0f} solves/s")
+
+    accuracy, accuracy_failures = check_accuracy(args.accuracy_tol)
+    for label, errors in accuracy.items():
+        print(
+            f"accuracy.{label:<27} single {errors['single_rel_error']:.2e}  batch {errors['batch_rel_error']:.2e}"
+            f"  adaptive peak {errors['adaptive_peak_rel_error']:.2e}  network {errors['network_rel_error']:.2e}"
+        )
+
+    history = load_history(args.history)
+    regressions = find_regressions(results, history, args.threshold, args.window)
+
+    if not args.no_record:
+        history.append(
+            {
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "results": results,
+                "accuracy": accuracy,
+            }
+        )
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.history, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2)
+
+    for message in regressions:
+        print(f"REGRESSION {message}", file=sys.stderr)
+    for message in accuracy_failures:
+        print(f"ACCURACY {message} exceeds {args.accuracy_tol:.1e}", file=sys.stderr)
+    return 1 if regressions or accuracy_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Headless CD40 immunosome simulation library.
+
+Importing this package only pulls in NumPy. pandas is imported on demand by
+the functions that return DataFrames, pyvis and networkx only when a network
+is rendered, and Streamlit is used only by ``app.py``.
+"""
+
+from .adaptive import nfkb_metrics, solve_signaling_adaptive
+from .cache import TrajectoryCache, cached_simulate_signaling_ode, cached_simulate_signaling_ode_batch, get_trajectory_cache
+from .crispr import (
+    CRISPR_TARGET_EFFECTS,
+    crispr_synergy_table,
+    knockout_multipliers,
+    load_target_library,
+    run_combinatorial_screen,
+    synergy_score,
+)
+from .fitting import fit_time_course, fit_time_courses, load_time_courses, simulate_with_sensitivities
+from .jobs import Job, JobCancelled, JobManager, get_job_manager
+from .metrics import RESPONSE_METRICS, evaluate_response_metrics
+from .model import (
+    PARAMETER_RANGES,
+    RATE_CONSTANTS,
+    generate_project_summary,
+    integrate_to_steady_state,
+    parameter_bounds,
+    run_null_model_comparison,
+    simulate_nfkb_metrics_batch,
+    simulate_signaling_ode,
+    simulate_signaling_ode_batch,
+    solve_steady_state,
+)
+from .montecarlo import (
+    RunningStats,
+    iter_monte_carlo_streaming,
+    run_monte_carlo,
+    run_monte_carlo_streaming,
+    summarize_monte_carlo,
+)
+from .network import render_network_html
+from .reactions import (
+    CD40_NETWORK,
+    ReactionNetwork,
+    simulate_network_batch,
+    simulate_network_ssa,
+    simulate_network_stiff,
+    simulate_network_tau_leap,
+)
+from .sensitivity import run_global_sensitivity
+from .stochastic import run_stochastic_ensemble
+from .store import ResultStore, StoredResult, get_result_store, global_sensitivity_stored, iter_monte_carlo_stored
+from .surrogate import ResponseSurrogate, build_surrogate, get_surrogate
+
+__all__ = [
+    "CD40_NETWORK",
+    "CRISPR_TARGET_EFFECTS",
+    "Job",
+    "JobCancelled",
+    "JobManager",
+    "PARAMETER_RANGES",
+    "RATE_CONSTANTS",
+    "RESPONSE_METRICS",
+    "ReactionNetwork",
+    "ResponseSurrogate",
+    "ResultStore",
+    "RunningStats",
+    "StoredResult",
+    "TrajectoryCache",
+    "build_surrogate",
+    "cached_simulate_signaling_ode",
+    "cached_simulate_signaling_ode_batch",
+    "crispr_synergy_table",
+    "evaluate_response_metrics",
+    "fit_time_course",
+    "fit_time_courses",
+    "generate_project_summary",
+    "get_job_manager",
+    "get_result_store",
+    "get_surrogate",
+    "get_trajectory_cache",
+    "global_sensitivity_stored",
+    "integrate_to_steady_state",
+    "iter_monte_carlo_stored",
+    "iter_monte_carlo_streaming",
+    "knockout_multipliers",
+    "load_target_library",
+    "load_time_courses",
+    "nfkb_metrics",
+    "parameter_bounds",
+    "render_network_html",
+    "run_combinatorial_screen",
+    "run_global_sensitivity",
+    "run_monte_carlo",
+    "run_monte_carlo_streaming",
+    "run_null_model_comparison",
+    "run_stochastic_ensemble",
+    "simulate_network_batch",
+    "simulate_network_ssa",
+    "simulate_network_stiff",
+    "simulate_network_tau_leap",
+    "simulate_nfkb_metrics_batch",
+    "simulate_signaling_ode",
+    "simulate_signaling_ode_batch",
+    "simulate_with_sensitivities",
+    "solve_signaling_adaptive",
+    "solve_steady_state",
+    "summarize_monte_carlo",
+    "synergy_score",
+]
@@ -0,0 +1,133 @@
+"""Process-wide LRU cache of solver trajectories."""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .model import simulate_signaling_ode, simulate_signaling_ode_batch
+
+
+class TrajectoryCache:
+    """Thread-safe LRU cache for solver output (or any derived artifact) with a memory budget.
+
+    Entries are evicted least-recently-used first once either ``max_entries``
+    or ``max_bytes`` is exceeded. Cached arrays are marked read-only because
+    the same object is handed to every caller.
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        with self._lock:
+            if key in self._entries:
+                self._nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self._nbytes += nbytes
+            while self._entries and (len(self._entries) > self.max_entries or self._nbytes > self.max_bytes):
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._nbytes -= evicted_bytes
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry and reset the hit, miss and eviction counters."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+CACHE_DECIMALS = 6
+
+
+_trajectory_cache = TrajectoryCache()
+
+
+def get_trajectory_cache():
+    """One cache per server process, shared by every session and rerun."""
+    return _trajectory_cache
+
+
+def trajectory_cache_key(k1, k2, k3, k4, k6, k7, k8, cd40_input, t_max, points):
+    rates = (k1, k2, k3, k4, k6, k7, k8, cd40_input)
+    return tuple(round(float(value), CACHE_DECIMALS) for value in rates) + (float(t_max), int(points))
+
+
+def cached_simulate_signaling_ode_batch(k1, k2, k3, k4, k6, k7, k8, cd40_input=1.0, t_max=200, points=2000):
+    """Memoized ``simulate_signaling_ode_batch``.
+
+    Each member is looked up individually under its rounded parameter tuple,
+    so batches that share members with earlier calls (the CRISPR baseline and
+    the main ODE solve, for instance) only integrate the misses.
+    """
+    cache = get_trajectory_cache()
+    members = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (k1, k2, k3, k4, k6, k7, k8, cd40_input))
+    )
+    n = members[0].shape[0]
+    t = np.linspace(0, t_max, points)
+    traf6 = np.empty((n, points))
+    nfkb = np.empty((n, points))
+    socs1 = np.empty((n, points))
+
+    keys = [trajectory_cache_key(*(param[i] for param in members), t_max, points) for i in range(n)]
+    missing = []
+    for i, key in enumerate(keys):
+        entry = cache.get(key)
+        if entry is None:
+            missing.append(i)
+        else:
+            traf6[i], nfkb[i], socs1[i] = entry
+
+    if missing:
+        if len(missing) == 1:
+            # A lone miss (a slider move) goes through the scalar kernel, which is
+            # much cheaper than a one-member vectorized solve and gives identical values.
+            solved = simulate_signaling_ode(*(param[missing[0]] for param in members), t_max=t_max, points=points)
+            traf6_m, nfkb_m, socs1_m = (species[None, :] for species in solved[1:])
+        else:
+            _, traf6_m, nfkb_m, socs1_m = simulate_signaling_ode_batch(*(param[missing] for param in members), t_max=t_max, points=points)
+        for j, i in enumerate(missing):
+            entry = tuple(np.array(species[j]) for species in (traf6_m, nfkb_m, socs1_m))
+            for array in entry:
+                array.flags.writeable = False
+            cache.put(keys[i], entry, sum(array.nbytes for array in entry))
+            traf6[i], nfkb[i], socs1[i] = entry
+
+    return t, traf6, nfkb, socs1
+
+
+def cached_simulate_signaling_ode(k1, k2, k3, k4, k6, k7, k8, cd40_input=1.0, t_max=200, points=2000):
+    """Memoized single-trajectory solve with the ``simulate_signaling_ode`` signature."""
+    t, traf6, nfkb, socs1 = cached_simulate_signaling_ode_batch(k1, k2, k3, k4, k6, k7, k8, cd40_input, t_max, points)
+    return t, traf6[0], nfkb[0], socs1[0]
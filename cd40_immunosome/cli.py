@@ -0,0 +1,373 @@
+"""Headless batch CLI.
+
+Streams parameter rows from CSV, Parquet or JSONL in fixed-size chunks and
+writes per-row NF-κB metrics, so arbitrarily large inputs are scored with
+bounded memory::
+
+    python -m cd40_immunosome score params.csv -o metrics.parquet --target SOCS1 --target IL-10
+
+Input columns ``k1`` … ``k8`` and ``cd40_input`` are optional; missing ones
+take the sidebar defaults. Every other input column is passed through.
+
+``screen`` ranks multi-gene knockout combinations from a target library::
+
+    python -m cd40_immunosome screen library.csv --size 2 --top-k 100 -o hits.csv
+
+``fit`` calibrates the rate constants to measured time courses, one row per sample::
+
+    python -m cd40_immunosome fit donors.csv -o fits.csv --starts 16
+
+``stochastic`` writes per-cell peak NF-κB and time-to-peak of an intrinsic-noise ensemble::
+
+    python -m cd40_immunosome stochastic -o cells.csv --volume 20 --param cd40_input=0.5
+
+``surrogate`` builds the response table behind the app's surrogate mode and prints its held-out errors::
+
+    python -m cd40_immunosome surrogate --workers 8
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .adaptive import METRIC_METHODS
+from .crispr import (
+    CRISPR_TARGET_EFFECTS,
+    SCREEN_RANK_KEYS,
+    knockout_multipliers,
+    load_target_library,
+    run_combinatorial_screen,
+    synergy_score,
+)
+from .fitting import fit_time_courses, load_time_courses
+from .metrics import RESPONSE_METRICS, evaluate_response_metrics
+from .model import PARAMETER_RANGES, RATE_CONSTANTS
+from .stochastic import STOCHASTIC_METHODS, run_stochastic_ensemble
+from .surrogate import SURROGATE_NODES, build_surrogate
+
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    try:
+        return FORMATS[Path(path).suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Cannot infer file format from {path!r}; pass --input-format/--output-format.") from None
+
+
+def iter_parameter_chunks(path, chunk_size=10_000, fmt=None):
+    """Yield DataFrames of at most ``chunk_size`` rows without loading the whole file."""
+    import pandas as pd
+
+    fmt = detect_format(path, fmt)
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif fmt == "jsonl":
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported input format: {fmt!r}")
+
+
+class ChunkWriter:
+    """Append DataFrame chunks to a CSV, JSONL or Parquet file."""
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.fmt = detect_format(path, fmt)
+        self._handle = None
+        self._parquet = None
+
+    def write(self, frame):
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+            return
+
+        first = self._handle is None
+        if first:
+            self._handle = open(self.path, "w", encoding="utf-8", newline="")
+        if self.fmt == "csv":
+            frame.to_csv(self._handle, header=first, index=False)
+        elif self.fmt == "jsonl":
+            text = frame.to_json(orient="records", lines=True, force_ascii=False)
+            self._handle.write(text if text.endswith("\n") else text + "\n")
+        else:
+            raise ValueError(f"Unsupported output format: {self.fmt!r}")
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+        if self._parquet is not None:
+            self._parquet.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def score_parameter_frame(frame, targets=("SOCS1",), t_max=200, points=1000, method="dopri5"):
+    """Append peak, t_peak, AUC, steady state and per-target synergy columns to ``frame``.
+
+    The baseline rows and every knockout variant are scored in one batched
+    evaluation, with the adaptive solver by default (``method="rk4"`` uses a
+    fixed ``points`` grid, which can diverge to NaN at stiff parameter sets).
+    """
+    n = len(frame)
+    columns = {}
+    for name in RATE_CONSTANTS + ("cd40_input",):
+        default = PARAMETER_RANGES[name][3]
+        columns[name] = frame[name].to_numpy(dtype=float) if name in frame else np.full(n, default)
+
+    rates = np.column_stack([columns[name] for name in RATE_CONSTANTS])
+    multipliers = knockout_multipliers(targets)
+    all_rates = np.concatenate([rates] + [rates * mult for mult in multipliers])
+    all_cd40 = np.tile(columns["cd40_input"], len(targets) + 1)
+
+    metrics = evaluate_response_metrics(all_rates, all_cd40, t_max=t_max, points=points, method=method)
+
+    scored = frame.copy()
+    for name in RESPONSE_METRICS:
+        scored[name] = metrics[name][:n]
+    for j, target in enumerate(targets, start=1):
+        scored[f"synergy_{target}"] = synergy_score(metrics["auc"][j * n:(j + 1) * n], metrics["auc"][:n])
+    return scored
+
+
+def run_score(args):
+    targets = tuple(args.target or ["SOCS1"])
+    unknown = [target for target in targets if target not in CRISPR_TARGET_EFFECTS]
+    if unknown:
+        raise SystemExit(f"Unknown CRISPR target(s): {', '.join(unknown)}. Known: {', '.join(CRISPR_TARGET_EFFECTS)}")
+
+    started = time.perf_counter()
+    rows = nonfinite = 0
+    with ChunkWriter(args.output, args.output_format) as writer:
+        for chunk in iter_parameter_chunks(args.input, args.chunk_size, args.input_format):
+            scored = score_parameter_frame(chunk, targets, t_max=args.t_max, points=args.points, method=args.method)
+            writer.write(scored)
+            rows += len(chunk)
+            nonfinite += int((~np.isfinite(scored[list(RESPONSE_METRICS)].to_numpy(dtype=float)).all(axis=1)).sum())
+            if not args.quiet:
+                elapsed = time.perf_counter() - started
+                print(f"scored {rows:,} rows ({rows / elapsed:,.0f} rows/s)", file=sys.stderr)
+    if nonfinite:
+        print(f"warning: {nonfinite:,} of {rows:,} rows have non-finite metrics", file=sys.stderr)
+    return 0
+
+
+def parse_params(assignments):
+    """Sidebar defaults for ``k1`` … ``k8`` and ``cd40_input``, overridden by ``NAME=VALUE`` strings."""
+    params = {name: PARAMETER_RANGES[name][3] for name in RATE_CONSTANTS + ("cd40_input",)}
+    for assignment in assignments or []:
+        name, _, value = assignment.partition("=")
+        if name not in params or not value:
+            raise SystemExit(f"Invalid --param {assignment!r}; expected NAME=VALUE with NAME in {', '.join(params)}.")
+        params[name] = float(value)
+    return params
+
+
+def run_screen(args):
+    effects = load_target_library(args.library) if args.library else CRISPR_TARGET_EFFECTS
+    params = parse_params(args.param)
+
+    started = time.perf_counter()
+
+    def report(done, total):
+        if not args.quiet:
+            elapsed = time.perf_counter() - started
+            print(f"screened {done:,}/{total:,} combinations ({done / elapsed:,.0f} solves/s)", file=sys.stderr)
+
+    hits = run_combinatorial_screen(
+        *(params[name] for name in RATE_CONSTANTS + ("cd40_input",)),
+        effects=effects,
+        sizes=tuple(args.size or [2]),
+        top_k=args.top_k,
+        rank_by=args.rank_by,
+        chunk_size=args.chunk_size,
+        t_max=args.t_max,
+        method=args.method,
+        points=args.points,
+        workers=args.workers,
+        progress=report,
+    )
+    if args.output:
+        with ChunkWriter(args.output, args.output_format) as writer:
+            writer.write(hits)
+    else:
+        print(hits.to_string(index=False))
+    return 0
+
+
+def run_fit(args):
+    samples = load_time_courses(args.input)
+    started = time.perf_counter()
+
+    def report(done, total):
+        if not args.quiet:
+            elapsed = time.perf_counter() - started
+            print(f"fitted {done:,}/{total:,} samples ({elapsed / done:.1f} s/sample)", file=sys.stderr)
+
+    fits = fit_time_courses(
+        samples,
+        n_starts=args.starts,
+        seed=args.seed,
+        workers=args.workers,
+        max_iter=args.max_iter,
+        progress=report,
+    )
+    with ChunkWriter(args.output, args.output_format) as writer:
+        writer.write(fits)
+    return 0
+
+
+def run_stochastic(args):
+    import pandas as pd
+
+    params = parse_params(args.param)
+    started = time.perf_counter()
+
+    def report(done, total):
+        if not args.quiet:
+            elapsed = time.perf_counter() - started
+            print(f"simulated {done:,}/{total:,} cells ({done / elapsed:,.0f} cells/s)", file=sys.stderr)
+
+    ensemble = run_stochastic_ensemble(
+        *(params[name] for name in RATE_CONSTANTS + ("cd40_input",)),
+        volume=args.volume,
+        cells=args.cells,
+        t_max=args.t_max,
+        points=args.points,
+        method=args.method,
+        seed=args.seed,
+        workers=args.workers,
+        progress=report,
+    )
+    if not args.quiet:
+        print(
+            f"{ensemble['method']}: peak {ensemble['peak_mean']:.3f} ± {ensemble['peak_std']:.3f} "
+            f"(ODE {ensemble['deterministic_peak']:.3f}), t_peak {ensemble['t_peak_mean']:.1f} ± "
+            f"{ensemble['t_peak_std']:.1f} (ODE {ensemble['deterministic_t_peak']:.1f})",
+            file=sys.stderr,
+        )
+    with ChunkWriter(args.output, args.output_format) as writer:
+        writer.write(pd.DataFrame({"cell": np.arange(args.cells), "peak": ensemble["peak"], "t_peak": ensemble["t_peak"]}))
+    return 0
+
+
+def run_surrogate(args):
+    started = time.perf_counter()
+
+    def report(done, total):
+        if not args.quiet:
+            elapsed = time.perf_counter() - started
+            print(f"solved {done:,}/{total:,} parameter sets ({done / elapsed:,.0f} solves/s)", file=sys.stderr)
+
+    surrogate = build_surrogate(
+        nodes=args.nodes, validation=args.validation, seed=args.seed, workers=args.workers, progress=report
+    )
+    print(f"surrogate table {surrogate.meta['key']}: {'×'.join(map(str, surrogate.shape))} nodes")
+    for name, errors in surrogate.meta["result"]["validation"].items():
+        print(
+            f"{name}: median error {errors['median_error']:.2%}, 95th percentile {errors['p95_error']:.2%}, "
+            f"median bound {errors['median_bound']:.2%}"
+        )
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cd40_immunosome", description="Headless CD40 immunosome simulations.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score = commands.add_parser("score", help="Score parameter rows from CSV/Parquet/JSONL.")
+    score.add_argument("input", help="Input file (.csv, .parquet, .jsonl).")
+    score.add_argument("-o", "--output", required=True, help="Output file (.csv, .parquet, .jsonl).")
+    score.add_argument("--input-format", choices=sorted(set(FORMATS.values())))
+    score.add_argument("--output-format", choices=sorted(set(FORMATS.values())))
+    score.add_argument("--chunk-size", type=int, default=10_000, help="Rows per streamed chunk (default: 10000).")
+    score.add_argument("--target", action="append", default=None, help="CRISPR target for a synergy column; repeatable (default: SOCS1).")
+    score.add_argument("--t-max", type=float, default=200.0)
+    score.add_argument(
+        "--method", choices=METRIC_METHODS, default="dopri5",
+        help="Adaptive Dormand–Prince solver or the fixed RK4 grid (default: dopri5).",
+    )
+    score.add_argument("--points", type=int, default=1000, help="RK4 grid points per trajectory with --method rk4 (default: 1000).")
+    score.add_argument("-q", "--quiet", action="store_true")
+    score.set_defaults(func=run_score)
+
+    screen = commands.add_parser("screen", help="Rank multi-gene CRISPR knockout combinations.")
+    screen.add_argument("library", nargs="?", help="Target library CSV (target, k*_mult, note); default: built-in targets.")
+    screen.add_argument("-o", "--output", help="Output file (.csv, .parquet, .jsonl); default: print the table.")
+    screen.add_argument("--output-format", choices=sorted(set(FORMATS.values())))
+    screen.add_argument("--size", type=int, action="append", default=None, help="Knockouts per combination; repeatable (default: 2).")
+    screen.add_argument("--top-k", type=int, default=50, help="Combinations to keep (default: 50).")
+    screen.add_argument("--rank-by", choices=SCREEN_RANK_KEYS, default="synergy")
+    screen.add_argument("--param", action="append", default=None, help="Override a baseline parameter, e.g. k6=0.2; repeatable.")
+    screen.add_argument("--chunk-size", type=int, default=8192, help="Combinations per batched solve (default: 8192).")
+    screen.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU).")
+    screen.add_argument("--t-max", type=float, default=200.0)
+    screen.add_argument(
+        "--method", choices=METRIC_METHODS, default="dopri5",
+        help="Adaptive Dormand–Prince solver or the fixed RK4 grid (default: dopri5).",
+    )
+    screen.add_argument("--points", type=int, default=2000, help="RK4 grid points per trajectory with --method rk4 (default: 2000).")
+    screen.add_argument("-q", "--quiet", action="store_true")
+    screen.set_defaults(func=run_screen)
+
+    fit = commands.add_parser("fit", help="Fit k1…k8 to measured time courses (CSV).")
+    fit.add_argument("input", help="CSV with time, nfkb [, traf6, socs1, sample, cd40_input] columns.")
+    fit.add_argument("-o", "--output", required=True, help="Output file (.csv, .parquet, .jsonl).")
+    fit.add_argument("--output-format", choices=sorted(set(FORMATS.values())))
+    fit.add_argument("--starts", type=int, default=16, help="Multi-start candidates per sample (default: 16).")
+    fit.add_argument("--max-iter", type=int, default=100, help="Levenberg–Marquardt iterations per start (default: 100).")
+    fit.add_argument("--seed", type=int, default=None)
+    fit.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU).")
+    fit.add_argument("-q", "--quiet", action="store_true")
+    fit.set_defaults(func=run_fit)
+
+    stochastic = commands.add_parser("stochastic", help="Per-cell NF-κB peaks of a stochastic (intrinsic-noise) ensemble.")
+    stochastic.add_argument("-o", "--output", required=True, help="Output file (.csv, .parquet, .jsonl), one row per cell.")
+    stochastic.add_argument("--output-format", choices=sorted(set(FORMATS.values())))
+    stochastic.add_argument("--param", action="append", default=None, help="Override a baseline parameter, e.g. cd40_input=0.5; repeatable.")
+    stochastic.add_argument("--volume", type=float, default=100.0, help="System size Ω, molecules per concentration unit (default: 100).")
+    stochastic.add_argument("--cells", type=int, default=10_000, help="Cells in the ensemble (default: 10000).")
+    stochastic.add_argument("--method", choices=STOCHASTIC_METHODS, default="auto")
+    stochastic.add_argument("--seed", type=int, default=None)
+    stochastic.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU).")
+    stochastic.add_argument("--t-max", type=float, default=200.0)
+    stochastic.add_argument("--points", type=int, default=401, help="Output grid points per cell (default: 401).")
+    stochastic.add_argument("-q", "--quiet", action="store_true")
+    stochastic.set_defaults(func=run_stochastic)
+
+    surrogate = commands.add_parser("surrogate", help="Build the precomputed response table for surrogate mode.")
+    surrogate.add_argument(
+        "--nodes", type=int, default=SURROGATE_NODES,
+        help=f"Grid nodes per parameter (default: {SURROGATE_NODES}; the app reads the default table).",
+    )
+    surrogate.add_argument("--validation", type=int, default=2000, help="Held-out points that calibrate the error bounds (default: 2000).")
+    surrogate.add_argument("--seed", type=int, default=0)
+    surrogate.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU).")
+    surrogate.add_argument("-q", "--quiet", action="store_true")
+    surrogate.set_defaults(func=run_surrogate)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,284 @@
+"""Least-squares calibration of the rate constants against measured time courses.
+
+Gradients come from the forward sensitivity equations dS/dt = J·S + ∂f/∂p,
+integrated alongside the model with the same RK4 step, so every
+Levenberg–Marquardt iteration costs one (augmented) solve instead of one
+solve per parameter. All multi-start candidates of a sample are advanced
+together as one batch; samples (donors) are fitted in parallel worker
+processes.
+
+Parameters are fitted in log space inside box bounds (by default the slider
+ranges). With only NF-κB observed, k1·k3 and k6·k7 are identifiable only
+as products; the fitted curve is still well determined, but those
+individual constants should be read with care.
+"""
+
+import numpy as np
+
+from . import instrumentation
+from .jobs import process_map, worker_count
+from .model import RATE_CONSTANTS, parameter_bounds
+
+SPECIES = ("traf6", "nfkb", "socs1")
+
+# Accepted CSV spellings, mapped onto the canonical column names.
+COLUMN_ALIASES = {
+    "t": "time",
+    "time": "time",
+    "nfkb": "nfkb",
+    "nf-κb": "nfkb",
+    "nf-kb": "nfkb",
+    "traf6": "traf6",
+    "socs1": "socs1",
+    "sample": "sample",
+    "donor": "sample",
+    "cd40_input": "cd40_input",
+}
+
+# Lower bound for constants whose slider starts at 0 (k6, k7), so they can be fitted in log space.
+LOG_FLOOR = 1e-6
+
+
+def load_time_courses(source):
+    """Read time courses from a CSV path or file-like object.
+
+    Needs a ``time`` column and at least one of ``nfkb``, ``traf6`` and
+    ``socs1``; empty cells are treated as not measured. An optional
+    ``sample`` (or ``donor``) column splits the rows into independent
+    samples, and an optional ``cd40_input`` column gives each sample's
+    stimulus (default 1.0).
+
+    Returns ``{sample: {"t": (n,), "observed": {species: (n,)}, "cd40_input": float}}``.
+    """
+    import pandas as pd
+
+    frame = pd.read_csv(source)
+    frame.columns = [COLUMN_ALIASES.get(str(column).strip().lower(), str(column).strip()) for column in frame.columns]
+    if "time" not in frame:
+        raise ValueError("Time-course data needs a 'time' column.")
+    measured = [name for name in SPECIES if name in frame]
+    if not measured:
+        raise ValueError(f"Time-course data needs at least one of: {', '.join(SPECIES)}.")
+    if "sample" not in frame:
+        frame["sample"] = "sample"
+
+    samples = {}
+    for sample, rows in frame.groupby("sample", sort=False):
+        rows = rows.sort_values("time")
+        cd40 = rows["cd40_input"].dropna().unique() if "cd40_input" in rows else np.array([1.0])
+        if len(cd40) > 1:
+            raise ValueError(f"Sample {sample!r} has more than one cd40_input value.")
+        samples[sample] = {
+            "t": rows["time"].to_numpy(dtype=float),
+            "observed": {name: rows[name].to_numpy(dtype=float) for name in measured},
+            "cd40_input": float(cd40[0]) if len(cd40) else 1.0,
+        }
+    return samples
+
+
+def simulate_with_sensitivities(rates, cd40_input=1.0, t_max=200, points=1000, t_eval=None):
+    """Batched RK4 for the model and its forward parameter sensitivities.
+
+    ``rates`` is an (M, 7) array in ``RATE_CONSTANTS`` order. Returns
+    ``(t, states, sensitivities)`` with ``states`` of shape (M, 3, len(t))
+    (TRAF6, NF-κB, SOCS1) and ``sensitivities`` of shape (M, 3, 7, len(t))
+    holding d(species)/d(rate). With ``t_eval`` given, both are linearly
+    interpolated from the RK4 grid onto those times.
+    """
+    rates = np.atleast_2d(np.asarray(rates, dtype=float))
+    m = rates.shape[0]
+    k1, k2, k3, k4, k6, k7, k8 = rates.T
+    production = k1 * cd40_input
+    t = np.linspace(0, t_max, points)
+    dt = t[1] - t[0]
+    instrumentation.record_solve("batch_rk4_sensitivity", m, points - 1)
+
+    # Column 0 of the (3, 8, M) state holds the species, columns 1..7 their
+    # sensitivities, so each RK4 stage is one array update.
+    def rhs(z):
+        traf6, nfkb, socs1 = z[:, 0]
+        dz = np.empty_like(z)
+        # dS/dt = J·S + ∂f/∂p, written out for the sparse 3×3 Jacobian. Rows 1
+        # and 2 are linear, so the same expression also advances the species;
+        # row 0 gets its bilinear term corrected below.
+        dz[0] = -(k2 + k6 * socs1) * z[0] - k6 * traf6 * z[2]
+        dz[1] = k3 * z[0] - k4 * z[1]
+        dz[2] = k7 * z[1] - k8 * z[2]
+        dz[0, 0] += production + k6 * socs1 * traf6
+        dz[0, 1] += cd40_input
+        dz[0, 2] -= traf6
+        dz[0, 5] -= socs1 * traf6
+        dz[1, 3] += traf6
+        dz[1, 4] -= nfkb
+        dz[2, 6] += nfkb
+        dz[2, 7] -= socs1
+        return dz
+
+    augmented = np.zeros((points, 3, len(RATE_CONSTANTS) + 1, m))
+    for i in range(points - 1):
+        z = augmented[i]
+        a1 = rhs(z)
+        a2 = rhs(z + 0.5 * dt * a1)
+        a3 = rhs(z + 0.5 * dt * a2)
+        a4 = rhs(z + dt * a3)
+        augmented[i + 1] = z + (dt / 6.0) * (a1 + 2 * a2 + 2 * a3 + a4)
+
+    if t_eval is not None:
+        t_eval = np.asarray(t_eval, dtype=float)
+        upper = np.clip(np.searchsorted(t, t_eval, side="right"), 1, points - 1)
+        weight = ((t_eval - t[upper - 1]) / dt)[:, None, None, None]
+        augmented = augmented[upper - 1] * (1 - weight) + augmented[upper] * weight
+        t = t_eval
+    return t, augmented[:, :, 0].transpose(2, 1, 0), augmented[:, :, 1:].transpose(3, 1, 2, 0)
+
+
+def _residuals(log_rates, sample, points):
+    """Scaled residuals (M, n_obs) and their Jacobian (M, n_obs, 7) w.r.t. log rates."""
+    rates = np.exp(log_rates)
+    t_obs = sample["t"]
+    _, states, sens = simulate_with_sensitivities(
+        rates, sample["cd40_input"], t_max=max(float(t_obs.max()), 1e-9), points=points, t_eval=t_obs
+    )
+    residuals, jacobians = [], []
+    for name, values in sample["observed"].items():
+        row = SPECIES.index(name)
+        mask = np.isfinite(values)
+        # Each species is scaled by its largest measured magnitude so they weigh equally.
+        scale = max(float(np.abs(values[mask]).max()), 1e-12) if mask.any() else 1.0
+        residuals.append((states[:, row, mask] - values[mask]) / scale)
+        # d/d log k = k · d/dk
+        jacobians.append(sens[:, row][:, :, mask].transpose(0, 2, 1) * rates[:, None, :] / scale)
+    return np.concatenate(residuals, axis=1), np.concatenate(jacobians, axis=1)
+
+
+def _fit_points(t_max, dt):
+    return max(int(np.ceil(t_max / dt)) + 1, 2)
+
+
+def fit_time_course(
+    sample, n_starts=16, bounds=None, initial=None, seed=None, max_iter=100, ftol=1e-10, dt=0.2
+):
+    """Fit k1…k8 to one sample from ``load_time_courses`` by multi-start Levenberg–Marquardt.
+
+    ``n_starts`` log-uniform starting points inside ``bounds`` ((7, 2),
+    default: slider ranges) are refined together as one batch; ``initial``
+    (7 rates) replaces the first start. The RK4 step is at most ``dt``.
+    A start stops when an accepted step lowers its cost by less than
+    ``ftol`` relative, or after ``max_iter`` iterations.
+
+    Returns a dict with the best ``rates`` (name → value), its ``cost``
+    (½·sum of squared scaled residuals) and ``rmse``, ``converged``,
+    ``iterations``, and every start's final ``start_rates`` / ``start_costs``.
+    """
+    bounds = parameter_bounds() if bounds is None else np.asarray(bounds, dtype=float)
+    log_bounds = np.log(np.maximum(bounds, LOG_FLOOR))
+    points = _fit_points(float(sample["t"].max()), dt)
+
+    rng = np.random.default_rng(seed)
+    log_rates = rng.uniform(log_bounds[:, 0], log_bounds[:, 1], size=(n_starts, len(RATE_CONSTANTS)))
+    if initial is not None:
+        log_rates[0] = np.clip(np.log(np.maximum(np.asarray(initial, dtype=float), LOG_FLOOR)), *log_bounds.T)
+
+    residuals, jacobian = _residuals(log_rates, sample, points)
+    cost = 0.5 * np.sum(residuals**2, axis=1)
+    damping = np.full(n_starts, 1e-3)
+    active = np.ones(n_starts, dtype=bool)
+    iterations = np.zeros(n_starts, dtype=int)
+    identity = np.eye(len(RATE_CONSTANTS))
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        idx = np.flatnonzero(active)
+        jac = jacobian[idx]
+        gradient = np.einsum("moi,mo->mi", jac, residuals[idx])
+        # Constants sitting on a bound with the gradient pointing outwards are held
+        # fixed for this step, so minima on the box boundary converge instead of
+        # crawling along clipped steps.
+        current = log_rates[idx]
+        free = ~(((current <= log_bounds[:, 0]) & (gradient > 0)) | ((current >= log_bounds[:, 1]) & (gradient < 0)))
+        gradient = gradient * free
+        hessian = np.einsum("moi,moj->mij", jac, jac) * free[:, :, None] * free[:, None, :]
+        diagonal = np.einsum("mii->mi", hessian)
+        system = hessian + damping[idx, None, None] * (diagonal[:, :, None] * identity + 1e-12 * identity)
+        system += (~free)[:, :, None] * identity
+        step = np.linalg.solve(system, -gradient[:, :, None])[:, :, 0]
+        trial = np.clip(current + step, log_bounds[:, 0], log_bounds[:, 1])
+
+        with np.errstate(over="ignore", invalid="ignore"):
+            trial_residuals, trial_jacobian = _residuals(trial, sample, points)
+            trial_cost = 0.5 * np.sum(trial_residuals**2, axis=1)
+        iterations[idx] += 1
+
+        accepted = np.isfinite(trial_cost) & (trial_cost < cost[idx])
+        improvement = np.where(accepted, (cost[idx] - trial_cost) / np.maximum(cost[idx], 1e-300), 0.0)
+        take = idx[accepted]
+        log_rates[take] = trial[accepted]
+        residuals[take] = trial_residuals[accepted]
+        jacobian[take] = trial_jacobian[accepted]
+        cost[take] = trial_cost[accepted]
+        damping[idx] = np.where(accepted, np.maximum(damping[idx] / 3.0, 1e-12), damping[idx] * 4.0)
+
+        done = (accepted & (improvement < ftol)) | (damping[idx] > 1e12) | (cost[idx] == 0)
+        active[idx[done]] = False
+
+    best = int(np.nanargmin(cost))
+    best_rates = np.exp(log_rates[best])
+    return {
+        "rates": dict(zip(RATE_CONSTANTS, best_rates.tolist())),
+        "cost": float(cost[best]),
+        "rmse": float(np.sqrt(2 * cost[best] / residuals.shape[1])),
+        "converged": not bool(active[best]),
+        "iterations": int(iterations[best]),
+        "start_rates": np.exp(log_rates),
+        "start_costs": cost,
+    }
+
+
+def _fit_task(task):
+    name, sample, kwargs = task
+    return name, fit_time_course(sample, **kwargs)
+
+
+def fit_time_courses(samples, n_starts=16, bounds=None, seed=None, workers=None, progress=None, **kwargs):
+    """Fit every sample of ``load_time_courses`` output, in parallel worker processes.
+
+    Each sample gets its own child of ``SeedSequence(seed)``, so results do
+    not depend on ``workers``. ``progress(done, total)`` is called as samples
+    finish. Remaining keyword arguments go to ``fit_time_course``.
+
+    Returns a DataFrame with one row per sample: ``sample``, ``cd40_input``,
+    the fitted rate constants, ``rmse``, ``cost``, ``converged`` and ``iterations``.
+    """
+    import pandas as pd
+
+    names = list(samples)
+    seeds = np.random.SeedSequence(seed).spawn(len(names))
+    tasks = [
+        (name, samples[name], dict(kwargs, n_starts=n_starts, bounds=bounds, seed=child))
+        for name, child in zip(names, seeds)
+    ]
+
+    results = {}
+    with process_map(_fit_task, tasks, worker_count(workers, len(tasks))) as fits:
+        for name, result in fits:
+            results[name] = result
+            if progress is not None:
+                progress(len(results), len(tasks))
+
+    rows = []
+    for name in names:
+        result = results[name]
+        rows.append(
+            {
+                "sample": name,
+                "cd40_input": samples[name]["cd40_input"],
+                **result["rates"],
+                "rmse": result["rmse"],
+                "cost": result["cost"],
+                "converged": result["converged"],
+                "iterations": result["iterations"],
+            }
+        )
+    return pd.DataFrame(rows)
+
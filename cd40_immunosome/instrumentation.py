@@ -0,0 +1,217 @@
+"""Opt-in hot-path instrumentation: solve/step counters, phase timers and exports.
+
+Nothing is recorded unless either ``CD40_INSTRUMENT=1`` is set (process-wide
+counters) or a rerun is being traced with ``start_rerun`` (per-rerun
+counters for the current thread, as used by the dashboard's performance
+panel). When neither is active every hook returns immediately.
+
+Process-wide counters can be exported as a Prometheus text file with
+``write_prometheus`` and per-rerun records as JSON lines through the
+``cd40_immunosome.perf`` logger. ``export_from_env`` and
+``configure_logging_from_env`` wire both up from ``CD40_METRICS_FILE`` and
+``CD40_METRICS_LOG``.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger("cd40_immunosome.perf")
+
+_enabled = os.environ.get("CD40_INSTRUMENT", "") not in ("", "0")
+_lock = threading.Lock()
+_solves = defaultdict(int)
+_steps = defaultdict(int)
+_phases = defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0})
+_current_rerun = ContextVar("cd40_current_rerun", default=None)
+_log_configured = False
+
+
+class RerunStats:
+    """Counters and phase timings collected during one dashboard rerun."""
+
+    def __init__(self, label=""):
+        self.label = label
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self.solves = defaultdict(int)
+        self.steps = defaultdict(int)
+        self.phases = []
+
+    def as_record(self):
+        return {
+            "label": self.label,
+            "elapsed_s": self.elapsed,
+            "solves": dict(self.solves),
+            "steps": dict(self.steps),
+            "phases": [{"tab": tab, "phase": phase, "seconds": seconds} for tab, phase, seconds in self.phases],
+        }
+
+
+def enable(flag=True):
+    """Turn process-wide counters on or off at runtime."""
+    global _enabled
+    _enabled = bool(flag)
+
+
+def enabled():
+    """Whether process-wide counters are on (``CD40_INSTRUMENT`` or ``enable``)."""
+    return _enabled
+
+
+def record_solve(solver, members, steps):
+    """Count ``members`` trajectories integrated for ``steps`` steps each by ``solver``."""
+    rerun = _current_rerun.get()
+    if rerun is None and not _enabled:
+        return
+    member_steps = int(members) * int(steps)
+    with _lock:
+        _solves[solver] += int(members)
+        _steps[solver] += member_steps
+    if rerun is not None:
+        rerun.solves[solver] += int(members)
+        rerun.steps[solver] += member_steps
+
+
+@contextmanager
+def phase(tab, name):
+    """Time a block as phase ``name`` of ``tab`` (compute, dataframe, render, ...)."""
+    rerun = _current_rerun.get()
+    if rerun is None and not _enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        with _lock:
+            entry = _phases[(tab, name)]
+            entry["count"] += 1
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+        if rerun is not None:
+            rerun.phases.append((tab, name, seconds))
+
+
+def start_rerun(label=""):
+    """Begin tracing the current thread's rerun; returns the ``RerunStats`` being filled."""
+    rerun = RerunStats(label)
+    _current_rerun.set(rerun)
+    return rerun
+
+
+def finish_rerun():
+    """Stop tracing, log the rerun record and return it (``None`` if no rerun was traced)."""
+    rerun = _current_rerun.get()
+    if rerun is None:
+        return None
+    _current_rerun.set(None)
+    rerun.elapsed = time.perf_counter() - rerun.started
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(rerun.as_record(), ensure_ascii=False))
+    return rerun
+
+
+def cache_stats():
+    """Hit/miss statistics of every process-wide cache."""
+    from .cache import get_trajectory_cache
+    from .network import get_network_cache
+
+    return {"trajectory": get_trajectory_cache().stats(), "network": get_network_cache().stats()}
+
+
+def snapshot():
+    """Process-wide counters since start-up (or the last ``reset``)."""
+    with _lock:
+        return {
+            "solves": dict(_solves),
+            "steps": dict(_steps),
+            "phases": {f"{tab}/{name}": dict(entry) for (tab, name), entry in _phases.items()},
+            "caches": cache_stats(),
+        }
+
+
+def reset():
+    with _lock:
+        _solves.clear()
+        _steps.clear()
+        _phases.clear()
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    """Render the process-wide counters in the Prometheus text exposition format."""
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            rendered = ",".join(f'{key}="{_label_value(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{{{rendered}}} {value}")
+
+    with _lock:
+        solves = dict(_solves)
+        steps = dict(_steps)
+        phases = {key: dict(entry) for key, entry in _phases.items()}
+
+    family("cd40_ode_solves_total", "counter", "Trajectories integrated, by solver.", [({"solver": s}, n) for s, n in solves.items()])
+    family("cd40_integration_steps_total", "counter", "Member-steps integrated, by solver.", [({"solver": s}, n) for s, n in steps.items()])
+    family(
+        "cd40_phase_seconds_total", "counter", "Wall time spent per dashboard phase.",
+        [({"tab": tab, "phase": name}, entry["total"]) for (tab, name), entry in phases.items()],
+    )
+    family(
+        "cd40_phase_runs_total", "counter", "Executions per dashboard phase.",
+        [({"tab": tab, "phase": name}, entry["count"]) for (tab, name), entry in phases.items()],
+    )
+    family(
+        "cd40_phase_seconds_max", "gauge", "Slowest observed execution per dashboard phase.",
+        [({"tab": tab, "phase": name}, entry["max"]) for (tab, name), entry in phases.items()],
+    )
+    caches = cache_stats()
+    for field, kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("entries", "gauge"), ("bytes", "gauge")):
+        suffix = "_total" if kind == "counter" else ""
+        family(
+            f"cd40_cache_{field}{suffix}", kind, f"Cache {field}.",
+            [({"cache": name}, stats[field]) for name, stats in caches.items()],
+        )
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Atomically write ``prometheus_text()`` to ``path`` (node-exporter textfile style)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+
+def configure_logging_from_env():
+    """Send per-rerun JSON records to the file named by ``CD40_METRICS_LOG`` (once per process)."""
+    global _log_configured
+    path = os.environ.get("CD40_METRICS_LOG")
+    with _lock:
+        if _log_configured or not path:
+            return
+        handler = logging.FileHandler(path, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        _log_configured = True
+
+
+def export_from_env():
+    """Refresh the Prometheus text file named by ``CD40_METRICS_FILE``, if set."""
+    path = os.environ.get("CD40_METRICS_FILE")
+    if path:
+        write_prometheus(path)
@@ -0,0 +1,302 @@
+"""Background jobs for long runs (Monte Carlo, sensitivity sweeps) off the UI thread.
+
+``JobManager`` runs submitted functions on a small thread pool; the heavy
+lifting inside each job still fans out to worker processes as usual. Jobs
+are keyed by a hash of their kind and arguments, so identical submissions
+from different sessions share one run. A job reports progress through the
+repo-wide ``progress(done, total)`` callback, which is also where
+cancellation takes effect: once cancelled, the next callback raises
+``JobCancelled`` inside the job. Generator functions publish every yielded
+value as the job's partial result, and the last one becomes its result.
+
+Status is available synchronously (``Job.snapshot``) for polling UIs and
+asynchronously (``Job.watch``, ``Job.wait_async``) for asyncio callers.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+JOB_STATES = ("queued", "running", "done", "cancelled", "failed")
+TERMINAL_STATES = ("done", "cancelled", "failed")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job (and by ``Job.wait``) once the job has been cancelled."""
+
+
+def map_bounded(pool, fn, tasks, depth):
+    """Ordered ``pool.map`` that keeps at most ``depth`` tasks in flight."""
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+        if len(pending) >= depth:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def worker_count(workers, n_tasks):
+    """Processes for ``n_tasks`` tasks: ``workers`` (``None`` for one per CPU), but never more than the tasks."""
+    return min(workers or os.cpu_count() or 1, max(n_tasks, 1))
+
+
+@contextmanager
+def process_map(fn, tasks, workers):
+    """Context manager yielding the ordered results of ``fn`` over ``tasks``.
+
+    With ``workers > 1`` the tasks run in a process pool with at most
+    ``2 * workers`` in flight; otherwise they run in this process. Leaving
+    the block early (an error, ``JobCancelled`` from a progress callback, a
+    closed generator) cancels every task not yet started.
+    """
+    if workers <= 1:
+        yield map(fn, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            yield map_bounded(pool, fn, tasks, 2 * workers)
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return repr(value)
+
+
+def job_key(kind, args=(), kwargs=None):
+    """Stable hex digest of a job's kind and arguments (floats hash by exact value)."""
+    payload = json.dumps([kind, list(args), kwargs or {}], default=_jsonable, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:20]
+
+
+class Job:
+    """One background run: status, progress, partial/final result and cancellation."""
+
+    def __init__(self, key, kind):
+        self.key = key
+        self.kind = kind
+        self.status = "queued"
+        self.done = 0
+        self.total = None
+        self.partial = None
+        self.result = None
+        self.error = None
+        self._subscribers = set()
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def progress(self, done, total):
+        """``progress(done, total)`` callback handed to the job function."""
+        with self._lock:
+            self.done, self.total = done, total
+        if self._cancel.is_set():
+            raise JobCancelled(self.key)
+
+    def publish(self, partial):
+        """Record an intermediate result; raises ``JobCancelled`` once cancelled."""
+        with self._lock:
+            self.partial = partial
+        if self._cancel.is_set():
+            raise JobCancelled(self.key)
+
+    def snapshot(self):
+        """Consistent copy of the job's state for rendering or serialization."""
+        with self._lock:
+            now = self.finished or time.time()
+            return {
+                "key": self.key,
+                "kind": self.kind,
+                "status": self.status,
+                "done": self.done,
+                "total": self.total,
+                "fraction": self.done / self.total if self.total else (1.0 if self.status == "done" else 0.0),
+                "partial": self.partial,
+                "result": self.result,
+                "error": None if self.error is None else f"{type(self.error).__name__}: {self.error}",
+                "elapsed_s": now - self.started if self.started else 0.0,
+                "subscribers": self.subscribers,
+            }
+
+    def wait(self, timeout=None):
+        """Block until the job ends; return its result or raise its error / ``JobCancelled``."""
+        try:
+            self.future.result(timeout)
+        except CancelledError:
+            pass
+        return self._outcome()
+
+    async def wait_async(self):
+        """Awaitable ``wait`` for asyncio callers; does not block the event loop."""
+        try:
+            await asyncio.wrap_future(self.future)
+        except (CancelledError, asyncio.CancelledError):
+            if not self.future.cancelled():
+                raise
+        return self._outcome()
+
+    async def watch(self, interval=0.25):
+        """Async iterator of snapshots every ``interval`` seconds, ending with the terminal one."""
+        while True:
+            snapshot = self.snapshot()
+            yield snapshot
+            if snapshot["status"] in TERMINAL_STATES:
+                return
+            await asyncio.sleep(interval)
+
+    def _outcome(self):
+        if self.status == "failed":
+            raise self.error
+        if self.status == "cancelled":
+            raise JobCancelled(self.key)
+        return self.result
+
+    def _set_status(self, status, **fields):
+        with self._lock:
+            self.status = status
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+
+class JobManager:
+    """Thread-pool job runner with cross-session deduplication.
+
+    ``submit`` returns the live (or finished) job with the same key instead
+    of starting a duplicate and records the ``subscriber`` (a session id;
+    anonymous submissions each count once). Re-submitting from the same
+    subscriber does not add a second subscription. ``cancel`` withdraws the
+    subscription and stops the job once none are left, so one session
+    cannot cancel a run another session is watching.
+    Up to ``max_finished`` completed jobs are kept, least recently
+    submitted first out, so re-submitting a finished job is instant.
+    """
+
+    def __init__(self, max_workers=2, max_finished=32):
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cd40-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, subscriber=None, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in the background, or join an identical job as ``subscriber``.
+
+        ``fn`` receives the job's ``progress`` callback when it takes a
+        ``progress`` parameter. If it returns a generator, every yielded
+        value becomes ``Job.partial`` and the last one ``Job.result``.
+        """
+        key = job_key(kind, args, kwargs)
+        subscriber = uuid.uuid4().hex if subscriber is None else subscriber
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status not in ("cancelled", "failed") and not job.cancel_requested:
+                job._subscribers.add(subscriber)
+                self._jobs.move_to_end(key)
+                return job
+            job = Job(key, kind)
+            job._subscribers.add(subscriber)
+            self._jobs[key] = job
+            self._prune()
+            job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def cancel(self, job, subscriber=None):
+        """Withdraw ``subscriber``'s subscription (any one if ``None``); the job stops once none is left.
+
+        Also used to let go of a finished job, which it leaves untouched.
+        """
+        with self._lock:
+            if subscriber is None:
+                if job._subscribers:
+                    job._subscribers.pop()
+            else:
+                job._subscribers.discard(subscriber)
+            if job._subscribers or job.status in TERMINAL_STATES:
+                return False
+            job._cancel.set()
+            if job.future.cancel():
+                job._set_status("cancelled", finished=time.time())
+            return True
+
+    def jobs(self):
+        """Snapshots of every tracked job, oldest first."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.snapshot() for job in jobs]
+
+    def shutdown(self, cancel=True):
+        if cancel:
+            with self._lock:
+                for job in self._jobs.values():
+                    job._cancel.set()
+        self._executor.shutdown(wait=True, cancel_futures=cancel)
+
+    def _prune(self):
+        finished = [key for key, job in self._jobs.items() if job.status in TERMINAL_STATES]
+        for key in finished[: max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[key]
+
+    def _run(self, job, fn, args, kwargs):
+        job._set_status("running", started=time.time())
+        try:
+            if "progress" in inspect.signature(fn).parameters:
+                kwargs = {**kwargs, "progress": job.progress}
+            result = fn(*args, **kwargs)
+            if inspect.isgenerator(result):
+                partials, result = result, None
+                try:
+                    for result in partials:
+                        job.publish(result)
+                finally:
+                    partials.close()
+        except JobCancelled:
+            job._set_status("cancelled", finished=time.time())
+        except Exception as exc:
+            job._set_status("failed", error=exc, finished=time.time())
+        else:
+            job._set_status("done", result=result, finished=time.time())
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """One job manager per server process, shared by every session and rerun.
+
+    ``CD40_JOB_WORKERS`` sets how many jobs run at once (default 2).
+    """
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager(max_workers=int(os.environ.get("CD40_JOB_WORKERS", "2")))
+        return _job_manager
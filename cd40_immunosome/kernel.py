@@ -0,0 +1,70 @@
+"""Allocation-free single-trajectory RK4 kernel.
+
+``rk4_kernel`` advances one parameter set on plain Python floats with the
+right-hand side fused into the RK4 stages and writes straight into
+preallocated output buffers, so a solve allocates three arrays instead of
+several per step. Its arithmetic matches ``simulate_signaling_ode_batch``
+operation for operation, so both paths give bit-identical trajectories.
+
+When numba is installed the same function is JIT-compiled on first use
+(compiled code is cached on disk); set ``CD40_JIT=0`` to force the
+pure-Python kernel.
+"""
+
+import os
+from functools import lru_cache
+
+
+def rk4_kernel(k1, k2, k3, k4, k6, k7, k8, cd40_input, dt, traf6, nfkb, socs1):
+    """Fill ``traf6[1:]``, ``nfkb[1:]`` and ``socs1[1:]`` from the initial values at index 0."""
+    production = k1 * cd40_input
+    half_dt = 0.5 * dt
+    sixth_dt = dt / 6.0
+    y_traf6 = float(traf6[0])
+    y_nfkb = float(nfkb[0])
+    y_socs1 = float(socs1[0])
+    for i in range(1, len(traf6)):
+        a1 = production - k2 * y_traf6 - k6 * y_socs1 * y_traf6
+        b1 = k3 * y_traf6 - k4 * y_nfkb
+        c1 = k7 * y_nfkb - k8 * y_socs1
+
+        s_traf6 = y_traf6 + half_dt * a1
+        s_nfkb = y_nfkb + half_dt * b1
+        s_socs1 = y_socs1 + half_dt * c1
+        a2 = production - k2 * s_traf6 - k6 * s_socs1 * s_traf6
+        b2 = k3 * s_traf6 - k4 * s_nfkb
+        c2 = k7 * s_nfkb - k8 * s_socs1
+
+        s_traf6 = y_traf6 + half_dt * a2
+        s_nfkb = y_nfkb + half_dt * b2
+        s_socs1 = y_socs1 + half_dt * c2
+        a3 = production - k2 * s_traf6 - k6 * s_socs1 * s_traf6
+        b3 = k3 * s_traf6 - k4 * s_nfkb
+        c3 = k7 * s_nfkb - k8 * s_socs1
+
+        s_traf6 = y_traf6 + dt * a3
+        s_nfkb = y_nfkb + dt * b3
+        s_socs1 = y_socs1 + dt * c3
+        a4 = production - k2 * s_traf6 - k6 * s_socs1 * s_traf6
+        b4 = k3 * s_traf6 - k4 * s_nfkb
+        c4 = k7 * s_nfkb - k8 * s_socs1
+
+        y_traf6 = y_traf6 + sixth_dt * (a1 + 2 * a2 + 2 * a3 + a4)
+        y_nfkb = y_nfkb + sixth_dt * (b1 + 2 * b2 + 2 * b3 + b4)
+        y_socs1 = y_socs1 + sixth_dt * (c1 + 2 * c2 + 2 * c3 + c4)
+        traf6[i] = y_traf6
+        nfkb[i] = y_nfkb
+        socs1[i] = y_socs1
+
+
+@lru_cache(maxsize=1)
+def get_rk4_kernel():
+    """``(kernel, backend)``: the numba-compiled kernel if available, else the Python one."""
+    if os.environ.get("CD40_JIT", "1") not in ("", "0"):
+        try:
+            import numba
+        except ImportError:
+            pass
+        else:
+            return numba.njit(cache=True, fastmath=False)(rk4_kernel), "rk4_jit"
+    return rk4_kernel, "rk4_scalar"
@@ -0,0 +1,310 @@
+"""Core TRAF6/NF-κB/SOCS1 model: parameter ranges, solvers and steady states."""
+
+import numpy as np
+
+from . import instrumentation
+from .kernel import get_rk4_kernel
+from .reactions import CD40_NETWORK
+
+RATE_CONSTANTS = ("k1", "k2", "k3", "k4", "k6", "k7", "k8")
+
+# Sidebar slider specs: (label, min, max, default[, step]). The sensitivity
+# designs sample the same bounded ranges the user can reach interactively.
+PARAMETER_RANGES = {
+    "k1": ("k1 (CD40→TRAF6 recruitment)", 0.01, 0.20, 0.08),
+    "k2": ("k2 (TRAF6 decay)", 0.01, 0.20, 0.06),
+    "k3": ("k3 (TRAF6→NF-κB activation)", 0.01, 0.25, 0.10),
+    "k4": ("k4 (NF-κB decay)", 0.01, 0.20, 0.05),
+    "k6": ("k6 (SOCS1 inhibition strength)", 0.0, 0.5, 0.05),
+    "k7": ("k7 (NF-κB → SOCS1 induction)", 0.0, 0.5, 0.05),
+    "k8": ("k8 (SOCS1 decay)", 0.01, 0.5, 0.1),
+    "cd40_input": ("CD40 input level", 0.5, 2.0, 1.0, 0.1),
+}
+
+
+def parameter_bounds(names=RATE_CONSTANTS):
+    """(k, 2) array of slider [min, max] bounds for ``names``."""
+    return np.array([PARAMETER_RANGES[name][1:3] for name in names], dtype=float)
+
+
+def generate_project_summary(scaffold, ligand, k1, k2, k3, k4, k6, k7, k8, cd40_input):
+    equations = "\n".join(f"  {line}" for line in CD40_NETWORK.equations())
+    return f"""
+CD40 IMMUNOSOME – SYSTEMS BIOLOGY SUMMARY
+======================================
+
+Current setup
+-------------
+Scaffold: {scaffold}
+Ligand: {ligand}
+Kinetic constants: k1={k1:.3f}, k2={k2:.3f}, k3={k3:.3f}, k4={k4:.3f}, k6={k6:.3f}, k7={k7:.3f}, k8={k8:.3f}
+CD40 input level: {cd40_input:.2f}
+
+Modeling note
+-------------
+Kinetic simulations are solved numerically as a coupled ODE system:
+{equations}
+
+CRISPR synergy note
+-------------------
+Synergy is computed dynamically from model responses:
+  Score = ((KO+Agonist AUC - Baseline AUC) / Baseline AUC) × 100
+
+Disclaimer
+----------
+Outputs are hypothesis-generation aids and do not replace wet-lab validation.
+"""
+
+
+def simulate_signaling_ode(k1, k2, k3, k4, k6, k7, k8, cd40_input=1.0, t_max=200, points=2000):
+    """Numerically solve coupled ODEs using an RK4 integrator.
+
+    Runs the fused scalar kernel from ``kernel.py`` (numba-compiled when
+    available) into preallocated arrays; results are bit-identical to a
+    one-member ``simulate_signaling_ode_batch``.
+    """
+    kernel, backend = get_rk4_kernel()
+    instrumentation.record_solve(backend, 1, points - 1)
+    t = np.linspace(0, t_max, points)
+    dt = t[1] - t[0]
+
+    traf6 = np.zeros(points)
+    nfkb = np.zeros(points)
+    socs1 = np.zeros(points)
+    kernel(*(float(value) for value in (k1, k2, k3, k4, k6, k7, k8, cd40_input, dt)), traf6, nfkb, socs1)
+    return t, traf6, nfkb, socs1
+
+
+def simulate_signaling_ode_batch(k1, k2, k3, k4, k6, k7, k8, cd40_input=1.0, t_max=200, points=2000):
+    """Solve N parameter sets together with a vectorized RK4 integrator.
+
+    Every rate constant and ``cd40_input`` may be a scalar or an array of shape
+    (N,); scalars are broadcast against the arrays. All N trajectories are
+    advanced in lockstep as an (N, 3) state array, so the Python-level loop
+    runs once per time step rather than once per parameter set.
+
+    Returns ``t`` with shape (points,) and TRAF6, NF-κB and SOCS1 trajectories
+    with shape (N, points).
+
+    This is a hand-fused form of ``reactions.CD40_NETWORK``; the generic
+    ``simulate_network_batch`` returns identical trajectories for that
+    network at roughly twice the cost for three species.
+
+    Batching removes the per-set Python overhead, not the arithmetic, so the
+    cost still grows linearly with N. On one core, 10,000 sets on the
+    default 2,000-point grid take about 1.7 s, roughly a thousand single
+    solves' worth, and the (points, N, 3) float64 state array takes about
+    480 MB. Callers that only need peak, time-to-peak or AUC should use
+    ``simulate_nfkb_metrics_batch`` (O(N) memory) or solve in chunks.
+    """
+    k1, k2, k3, k4, k6, k7, k8, cd40_input = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (k1, k2, k3, k4, k6, k7, k8, cd40_input))
+    )
+    t = np.linspace(0, t_max, points)
+    dt = t[1] - t[0]
+    production = k1 * cd40_input
+    instrumentation.record_solve("batch_rk4", k1.shape[0], points - 1)
+
+    states = np.zeros((points, k1.shape[0], 3))
+
+    def rhs(y):
+        y_traf6, y_nfkb, y_socs1 = y[:, 0], y[:, 1], y[:, 2]
+        dy = np.empty_like(y)
+        dy[:, 0] = production - k2 * y_traf6 - k6 * y_socs1 * y_traf6
+        dy[:, 1] = k3 * y_traf6 - k4 * y_nfkb
+        dy[:, 2] = k7 * y_nfkb - k8 * y_socs1
+        return dy
+
+    for i in range(points - 1):
+        y = states[i]
+        rk1 = rhs(y)
+        rk2 = rhs(y + 0.5 * dt * rk1)
+        rk3 = rhs(y + 0.5 * dt * rk2)
+        rk4 = rhs(y + dt * rk3)
+        states[i + 1] = y + (dt / 6.0) * (rk1 + 2 * rk2 + 2 * rk3 + rk4)
+
+    return t, states[:, :, 0].T, states[:, :, 1].T, states[:, :, 2].T
+
+
+def simulate_nfkb_metrics_batch(k1, k2, k3, k4, k6, k7, k8, cd40_input=1.0, t_max=200, points=2000):
+    """Batched RK4 that keeps only NF-κB peak, time-to-peak and AUC.
+
+    Same grid and update as ``simulate_signaling_ode_batch``, but the
+    trajectory is reduced while it is integrated (running maximum and
+    trapezoidal area), so memory is O(N) instead of O(N · points). Use it
+    when only summary metrics are needed (screens, large designs).
+
+    Returns a dict of (N,) arrays: ``peak``, ``t_peak``, ``auc`` and the
+    final NF-κB value ``nfkb_end``.
+    """
+    k1, k2, k3, k4, k6, k7, k8, cd40_input = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (k1, k2, k3, k4, k6, k7, k8, cd40_input))
+    )
+    n = k1.shape[0]
+    t = np.linspace(0, t_max, points)
+    dt = t[1] - t[0]
+    half_dt = 0.5 * dt
+    production = k1 * cd40_input
+    instrumentation.record_solve("batch_rk4_metrics", n, points - 1)
+
+    # One contiguous array per species: nothing is stored per step, so the
+    # column-view overhead of the (N, 3) layout buys nothing here.
+    def rhs(y_traf6, y_nfkb, y_socs1):
+        return (
+            production - k2 * y_traf6 - k6 * y_socs1 * y_traf6,
+            k3 * y_traf6 - k4 * y_nfkb,
+            k7 * y_nfkb - k8 * y_socs1,
+        )
+
+    traf6 = np.zeros(n)
+    nfkb = np.zeros(n)
+    socs1 = np.zeros(n)
+    peak = np.zeros(n)
+    peak_index = np.zeros(n, dtype=np.intp)
+    auc = np.zeros(n)
+    for i in range(1, points):
+        a1, b1, c1 = rhs(traf6, nfkb, socs1)
+        a2, b2, c2 = rhs(traf6 + half_dt * a1, nfkb + half_dt * b1, socs1 + half_dt * c1)
+        a3, b3, c3 = rhs(traf6 + half_dt * a2, nfkb + half_dt * b2, socs1 + half_dt * c2)
+        a4, b4, c4 = rhs(traf6 + dt * a3, nfkb + dt * b3, socs1 + dt * c3)
+        nfkb_next = nfkb + (dt / 6.0) * (b1 + 2 * b2 + 2 * b3 + b4)
+        traf6 = traf6 + (dt / 6.0) * (a1 + 2 * a2 + 2 * a3 + a4)
+        socs1 = socs1 + (dt / 6.0) * (c1 + 2 * c2 + 2 * c3 + c4)
+        auc += (0.5 * (t[i] - t[i - 1])) * (nfkb + nfkb_next)
+        nfkb = nfkb_next
+        # Strict ">" keeps the first maximum, matching np.argmax on a stored trajectory.
+        peak_index = np.where(nfkb > peak, i, peak_index)
+        np.maximum(peak, nfkb, out=peak)
+
+    return {"peak": peak, "t_peak": t[peak_index], "auc": auc, "nfkb_end": nfkb}
+
+
+def integrate_to_steady_state(k1, k2, k3, k4, k6, k7, k8, cd40_input=1.0, y0=None, tol=1e-8, t_max=5000, dt=0.25, check_every=40):
+    """Integrate with RK4 until every member reaches steady state, then stop.
+
+    Convergence is declared once max|dy/dt| <= tol * max(1, max|y|) for a
+    member; converged members are dropped from the active set so the
+    remaining work shrinks as the ensemble settles. Members still moving at
+    ``t_max`` (for example a sustained oscillation) or blowing up under the
+    fixed step are reported as not converged.
+
+    Returns TRAF6, NF-κB, SOCS1 arrays of shape (N,), the boolean
+    ``converged`` flag and the time at which each member stopped.
+    """
+    k1, k2, k3, k4, k6, k7, k8, cd40_input = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (k1, k2, k3, k4, k6, k7, k8, cd40_input))
+    )
+    n = k1.shape[0]
+    y_final = np.zeros((n, 3)) if y0 is None else np.array(np.broadcast_to(y0, (n, 3)), dtype=float)
+    converged = np.zeros(n, dtype=bool)
+    t_reached = np.full(n, float(t_max))
+
+    active = np.arange(n)
+    y = y_final.copy()
+    rates = np.stack([k1 * cd40_input, k2, k3, k4, k6, k7, k8])
+    t = 0.0
+
+    def rhs(y, rates):
+        production, r2, r3, r4, r6, r7, r8 = rates
+        y_traf6, y_nfkb, y_socs1 = y[:, 0], y[:, 1], y[:, 2]
+        dy = np.empty_like(y)
+        dy[:, 0] = production - r2 * y_traf6 - r6 * y_socs1 * y_traf6
+        dy[:, 1] = r3 * y_traf6 - r4 * y_nfkb
+        dy[:, 2] = r7 * y_nfkb - r8 * y_socs1
+        return dy
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        while active.size and t < t_max:
+            instrumentation.record_solve("steady_state_rk4", active.size, check_every)
+            for _ in range(check_every):
+                rk1 = rhs(y, rates)
+                rk2 = rhs(y + 0.5 * dt * rk1, rates)
+                rk3 = rhs(y + 0.5 * dt * rk2, rates)
+                rk4 = rhs(y + dt * rk3, rates)
+                y = y + (dt / 6.0) * (rk1 + 2 * rk2 + 2 * rk3 + rk4)
+            t += check_every * dt
+
+            rate = np.abs(rhs(y, rates)).max(axis=1)
+            scale = np.maximum(1.0, np.abs(y).max(axis=1))
+            finite = np.isfinite(y).all(axis=1) & np.isfinite(rate)
+            settled = finite & (rate <= tol * scale)
+
+            # Diverged members keep their last finite checkpoint and stay unconverged.
+            y_final[active[finite]] = y[finite]
+            converged[active[settled]] = True
+            t_reached[active[settled]] = t
+            keep = finite & ~settled
+            active, y, rates = active[keep], y[keep], rates[:, keep]
+
+    return y_final[:, 0], y_final[:, 1], y_final[:, 2], converged, t_reached
+
+
+def solve_steady_state(k1, k2, k3, k4, k6, k7, k8, cd40_input=1.0, tol=1e-8, t_max=5000):
+    """Solve the TRAF6/NF-κB/SOCS1 fixed point directly.
+
+    Setting the derivatives to zero gives NF-κB* = (k3/k4)·TRAF6* and
+    SOCS1* = (k7/k8)·NF-κB*, so TRAF6* is the positive root of
+
+        a·TRAF6² + k2·TRAF6 - k1·CD40 = 0,   a = k6·k3·k7 / (k4·k8)
+
+    evaluated in the cancellation-free form 2·k1·CD40 / (k2 + sqrt(k2² + 4·a·k1·CD40)).
+    The root is accepted when the Routh–Hurwitz criterion for the Jacobian
+    says it is a stable equilibrium. Any member where the closed form is
+    undefined or unstable falls back to ``integrate_to_steady_state``.
+
+    Inputs broadcast like ``simulate_signaling_ode_batch``. Returns TRAF6,
+    NF-κB and SOCS1 arrays of shape (N,) plus a boolean ``converged`` flag.
+    """
+    k1, k2, k3, k4, k6, k7, k8, cd40_input = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (k1, k2, k3, k4, k6, k7, k8, cd40_input))
+    )
+    production = k1 * cd40_input
+    instrumentation.record_solve("steady_state_closed_form", k1.shape[0], 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        loop_gain = k6 * k3 * k7 / (k4 * k8)
+        traf6 = 2.0 * production / (k2 + np.sqrt(k2 * k2 + 4.0 * loop_gain * production))
+        nfkb = k3 * traf6 / k4
+        socs1 = k7 * nfkb / k8
+
+        # Characteristic polynomial λ³ + c2·λ² + c1·λ + c0 of the Jacobian.
+        traf6_decay = k2 + k6 * socs1
+        c2 = traf6_decay + k4 + k8
+        c1 = traf6_decay * k4 + traf6_decay * k8 + k4 * k8
+        c0 = traf6_decay * k4 * k8 + k6 * traf6 * k3 * k7
+        stable = (c2 > 0) & (c0 > 0) & (c2 * c1 > c0)
+
+    converged = stable & np.isfinite(traf6) & np.isfinite(nfkb) & np.isfinite(socs1)
+
+    fallback = np.flatnonzero(~converged)
+    if fallback.size:
+        traf6_f, nfkb_f, socs1_f, converged_f, _ = integrate_to_steady_state(
+            k1[fallback], k2[fallback], k3[fallback], k4[fallback], k6[fallback], k7[fallback], k8[fallback],
+            cd40_input[fallback], tol=tol, t_max=t_max,
+        )
+        traf6[fallback], nfkb[fallback], socs1[fallback] = traf6_f, nfkb_f, socs1_f
+        converged[fallback] = converged_f
+
+    return traf6, nfkb, socs1, converged
+
+
+def run_null_model_comparison(k1, k2, k3, k4, k6, k7, k8, cd40_input, solver=simulate_signaling_ode_batch):
+    """Feedback vs. no-feedback NF-κB time courses as a DataFrame.
+
+    ``solver`` takes the ``simulate_signaling_ode_batch`` signature, so the
+    app can pass the cached variant.
+    """
+    import pandas as pd
+
+    # Row 0: with feedback (3-variable model)
+    # Row 1: true linear null (no SOCS1 production and no inhibition)
+    t, _, nfkb, _ = solver(k1, k2, k3, k4, [k6, 0.0], [k7, 0.0], k8, cd40_input)
+
+    comparison_df = pd.DataFrame(
+        {
+            "Time": t,
+            "With SOCS1 Feedback": nfkb[0],
+            "Null Model (No Feedback)": nfkb[1],
+        }
+    )
+    return comparison_df
@@ -0,0 +1,275 @@
+"""Monte Carlo robustness runs: stored trajectories or parallel streaming statistics."""
+
+import numpy as np
+
+from . import instrumentation
+from .adaptive import nfkb_metrics
+from .jobs import process_map, worker_count
+from .model import simulate_signaling_ode_batch
+
+MC_PERTURBATION = (0.8, 1.2)
+MC_RAW_TRAJECTORY_LIMIT = 200
+
+# +1 where raising the rate raises NF-κB, -1 where it lowers it (k1..k8 order).
+MC_RATE_DIRECTIONS = np.array([1, -1, 1, -1, -1, -1, 1])
+
+
+def run_monte_carlo(
+    k1, k2, k3, k4, k6, k7, k8, cd40_input, iterations=50, points=800, seed=None, return_rates=False, chunk_size=1000,
+):
+    rng = np.random.default_rng(seed)
+
+    # One row per iteration, columns in k1, k2, k3, k4, k6, k7, k8 order. Drawing
+    # the block row-major keeps the per-seed results of the serial version.
+    factors = rng.uniform(*MC_PERTURBATION, size=(iterations, 7))
+    rates = np.array([k1, k2, k3, k4, k6, k7, k8]) * factors
+
+    # Solved ``chunk_size`` runs at a time, so only the NF-κB trajectories are
+    # held in full rather than the solver's (points, N, 3) state array.
+    nfkb = np.empty((iterations, points))
+    for start in range(0, max(iterations, 1), chunk_size):
+        t, _, nfkb[start : start + chunk_size], _ = simulate_signaling_ode_batch(
+            *rates[start : start + chunk_size].T, cd40_input, points=points
+        )
+    if return_rates:
+        # The perturbed rate sets, so that peak metrics can be recomputed adaptively.
+        return t, nfkb, rates
+    return t, nfkb
+
+
+class RunningStats:
+    """Streaming mean/variance (Welford, merged with Chan's formula) plus min/max.
+
+    Works element-wise, so the same accumulator tracks a scalar metric or a
+    whole time course. Memory is independent of how many samples are seen.
+    """
+
+    def __init__(self, shape=()):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+
+    def update(self, samples):
+        """Fold in a batch of samples stacked along axis 0."""
+        samples = np.asarray(samples, dtype=float)
+        if samples.shape[0] == 0:
+            return
+        batch_mean = samples.mean(axis=0)
+        batch_m2 = ((samples - batch_mean) ** 2).sum(axis=0)
+        self._combine(samples.shape[0], batch_mean, batch_m2, samples.min(axis=0), samples.max(axis=0))
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    def _combine(self, count, mean, m2, minimum, maximum):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self.m2 = self.m2 + m2 + delta * delta * (self.count * count / total)
+        self.min = np.minimum(self.min, minimum)
+        self.max = np.maximum(self.max, maximum)
+        self.count = total
+
+    @property
+    def std(self):
+        """Population standard deviation, matching ``np.std``."""
+        return np.sqrt(self.m2 / self.count) if self.count else np.full(np.shape(self.mean), np.nan)
+
+
+def monte_carlo_auc_range(k1, k2, k3, k4, k6, k7, k8, cd40_input, t_max=200, points=800, method="dopri5"):
+    """Deterministic AUC histogram range from the two extreme perturbation corners.
+
+    The corners push every rate toward lower or higher NF-κB, and the range
+    is padded by 2%. Draws that still land outside are counted as
+    under/overflow. Because the range is fixed before any sampling, shard
+    histograms can be summed directly.
+    """
+    rates = np.array([k1, k2, k3, k4, k6, k7, k8])
+    low, high = MC_PERTURBATION
+    low_corner = rates * np.where(MC_RATE_DIRECTIONS > 0, low, high)
+    high_corner = rates * np.where(MC_RATE_DIRECTIONS > 0, high, low)
+    auc = nfkb_metrics(*np.stack([low_corner, high_corner]).T, cd40_input, t_max=t_max, method=method, points=points)["auc"]
+    return 0.98 * float(auc.min()), 1.02 * float(auc.max())
+
+
+def _peak_metrics(t, nfkb, rates, cd40_input, method):
+    """Peak, time-to-peak and AUC: from the adaptive solver, or read off the stored grid for ``"rk4"``."""
+    if method == "rk4":
+        peak_index = np.argmax(nfkb, axis=1)
+        return nfkb[np.arange(nfkb.shape[0]), peak_index], t[peak_index], np.trapezoid(nfkb, t, axis=1)
+    metrics = nfkb_metrics(*rates.T, cd40_input, t_max=t[-1], method=method)
+    return metrics["peak"], metrics["t_peak"], metrics["auc"]
+
+
+def _monte_carlo_shard(task):
+    """Integrate one shard of the ensemble and return only its running statistics."""
+    seed_seq, count, rates, cd40_input, t_max, points, auc_edges, method, keep_runs = task
+    rng = np.random.default_rng(seed_seq)
+    perturbed = rates * rng.uniform(*MC_PERTURBATION, size=(count, len(rates)))
+    t, _, nfkb, _ = simulate_signaling_ode_batch(*perturbed.T, cd40_input, t_max=t_max, points=points)
+    peak, t_peak, auc = _peak_metrics(t, nfkb, perturbed, cd40_input, method)
+
+    shard = {
+        "trajectory": RunningStats(points),
+        "peak": RunningStats(),
+        "t_peak": RunningStats(),
+        "auc": RunningStats(),
+    }
+    shard["trajectory"].update(nfkb)
+    shard["peak"].update(peak)
+    shard["t_peak"].update(t_peak)
+    shard["auc"].update(auc)
+    shard["auc_hist"] = np.histogram(auc, bins=auc_edges)[0]
+    shard["auc_underflow"] = int(np.count_nonzero(auc < auc_edges[0]))
+    shard["auc_overflow"] = int(np.count_nonzero(auc > auc_edges[-1]))
+    if keep_runs:
+        shard["runs"] = {
+            "nfkb": nfkb.astype(np.float32),
+            "rates": perturbed.astype(np.float32),
+            "peak": np.asarray(peak, dtype=np.float32),
+            "t_peak": np.asarray(t_peak, dtype=np.float32),
+            "auc": np.asarray(auc, dtype=np.float32),
+        }
+    return shard
+
+
+def run_monte_carlo_streaming(
+    k1, k2, k3, k4, k6, k7, k8, cd40_input, iterations=100_000, t_max=200, points=800, seed=None,
+    workers=None, chunk_size=1000, auc_bins=20, auc_range=None, method="dopri5", progress=None,
+):
+    """Monte Carlo robustness run reduced on the fly instead of stored.
+
+    Iterations are cut into fixed ``chunk_size`` shards, each seeded from
+    ``SeedSequence(seed).spawn``. Shard results are merged in shard order,
+    so a given seed gives identical results for any ``workers`` value.
+    Each shard keeps only running statistics, so peak memory depends on
+    ``chunk_size`` and ``points``, not on ``iterations``.
+
+    The mean/std time course is taken on the ``points`` RK4 grid. Peak,
+    time-to-peak and AUC come from the adaptive solver's events by default,
+    or from that grid with ``method="rk4"``.
+
+    Returns a summary dict with the time grid, the mean/std NF-κB time
+    course, peak and time-to-peak moments, and a fixed-bin AUC histogram.
+    ``progress(done, total)`` is called with iteration counts after every shard.
+    """
+    summary = None
+    for summary in iter_monte_carlo_streaming(
+        k1, k2, k3, k4, k6, k7, k8, cd40_input, iterations=iterations, t_max=t_max, points=points, seed=seed,
+        workers=workers, chunk_size=chunk_size, auc_bins=auc_bins, auc_range=auc_range, method=method,
+        progress=progress,
+    ):
+        pass
+    return summary
+
+
+def iter_monte_carlo_streaming(
+    k1, k2, k3, k4, k6, k7, k8, cd40_input, iterations=100_000, t_max=200, points=800, seed=None,
+    workers=None, chunk_size=1000, auc_bins=20, auc_range=None, method="dopri5", progress=None, sink=None,
+):
+    """``run_monte_carlo_streaming`` yielding the running summary after every merged shard.
+
+    The last summary is the full result. Closing the generator early stops
+    the run; at most ``2 * workers`` shards are in flight at any time.
+
+    If given, ``sink(start, runs)`` receives every shard's per-run float32
+    arrays (``nfkb`` trajectories, perturbed ``rates``, ``peak``,
+    ``t_peak``, ``auc``) in shard order, with ``start`` the index of the
+    shard's first run; see ``store.iter_monte_carlo_stored``.
+    """
+    rates = np.array([k1, k2, k3, k4, k6, k7, k8], dtype=float)
+    if auc_range is None:
+        auc_range = monte_carlo_auc_range(k1, k2, k3, k4, k6, k7, k8, cd40_input, t_max=t_max, points=points, method=method)
+    auc_edges = np.linspace(auc_range[0], auc_range[1], auc_bins + 1)
+    t = np.linspace(0, t_max, points)
+
+    shard_sizes = [min(chunk_size, iterations - start) for start in range(0, iterations, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(shard_sizes))
+    tasks = [
+        (seed_seq, count, rates, cd40_input, t_max, points, auc_edges, method, sink is not None)
+        for seed_seq, count in zip(seeds, shard_sizes)
+    ]
+
+    total = _merge_monte_carlo_shards((), points, auc_bins)
+    if not tasks:
+        yield _monte_carlo_summary(t, total, auc_edges)
+    workers = worker_count(workers, len(tasks))
+    with process_map(_monte_carlo_shard, tasks, workers) as shards:
+        for shard in shards:
+            if sink is not None:
+                sink(total["trajectory"].count, shard["runs"])
+            _merge_monte_carlo_shards((shard,), points, auc_bins, total)
+            if workers > 1:
+                # Worker processes have their own counters; account for their solves here.
+                instrumentation.record_solve("batch_rk4", shard["trajectory"].count, points - 1)
+            if progress is not None:
+                progress(total["trajectory"].count, iterations)
+            yield _monte_carlo_summary(t, total, auc_edges)
+
+
+def _merge_monte_carlo_shards(shards, points, auc_bins, total=None):
+    if total is None:
+        total = {
+            "trajectory": RunningStats(points),
+            "peak": RunningStats(),
+            "t_peak": RunningStats(),
+            "auc": RunningStats(),
+            "auc_hist": np.zeros(auc_bins, dtype=np.int64),
+            "auc_underflow": 0,
+            "auc_overflow": 0,
+        }
+    for shard in shards:
+        for name in ("trajectory", "peak", "t_peak", "auc"):
+            total[name].merge(shard[name])
+        total["auc_hist"] += shard["auc_hist"]
+        total["auc_underflow"] += shard["auc_underflow"]
+        total["auc_overflow"] += shard["auc_overflow"]
+    return total
+
+
+def _monte_carlo_summary(t, stats, auc_edges):
+    return {
+        "t": t,
+        "iterations": stats["trajectory"].count,
+        "mean": stats["trajectory"].mean,
+        "std": stats["trajectory"].std,
+        "peak_mean": float(stats["peak"].mean),
+        "peak_std": float(stats["peak"].std),
+        "t_peak_mean": float(stats["t_peak"].mean),
+        "t_peak_std": float(stats["t_peak"].std),
+        "auc_mean": float(stats["auc"].mean),
+        "auc_std": float(stats["auc"].std),
+        "auc_hist_counts": stats["auc_hist"].copy(),
+        "auc_hist_edges": auc_edges,
+        "auc_underflow": stats["auc_underflow"],
+        "auc_overflow": stats["auc_overflow"],
+    }
+
+
+def summarize_monte_carlo(t, results, auc_bins=20, rates=None, cd40_input=1.0, method="dopri5"):
+    """Reduce stored ``run_monte_carlo`` trajectories to the streaming summary layout.
+
+    Given the perturbed ``rates`` (``run_monte_carlo(..., return_rates=True)``),
+    peak, time-to-peak and AUC come from the adaptive solver; otherwise they
+    are read off the stored grid.
+    """
+    peak, t_peak, auc = _peak_metrics(t, results, rates, cd40_input, "rk4" if rates is None else method)
+    hist_counts, hist_edges = np.histogram(auc, bins=auc_bins)
+    stats = {
+        "trajectory": RunningStats(results.shape[1]),
+        "peak": RunningStats(),
+        "t_peak": RunningStats(),
+        "auc": RunningStats(),
+        "auc_hist": hist_counts,
+        "auc_underflow": 0,
+        "auc_overflow": 0,
+    }
+    stats["trajectory"].update(results)
+    stats["peak"].update(peak)
+    stats["t_peak"].update(t_peak)
+    stats["auc"].update(auc)
+    return _monte_carlo_summary(t, stats, hist_edges)
@@ -0,0 +1,97 @@
+"""In-memory pyvis rendering of the CD40 signaling topology.
+
+The HTML is built as a string (nothing is written to disk) and cached by
+scaffold, ligand and the displayed k-values. Node positions are computed
+once per topology with a seeded spring layout and baked into the HTML with
+physics disabled, so the browser does not re-run the force simulation and
+relabelled graphs keep the same geometry.
+"""
+
+from functools import lru_cache
+
+from .cache import TrajectoryCache
+from .reactions import CD40_NETWORK
+
+NETWORK_NODES = (
+    ("NP", {"color": "#FF4B4B", "shape": "diamond", "size": 30}),
+    ("CD40", {"color": "#1f77b4", "size": 25}),
+    ("TRAF6", {"color": "#ff7f0e"}),
+    ("NFkB", {"color": "#2ca02c"}),
+    ("SOCS1", {"color": "#8c564b"}),
+    ("TCell", {"color": "#9467bd", "shape": "star", "size": 30}),
+)
+
+# Signaling edges come from the reaction specification; the vehicle and the
+# T-cell readout are display-only nodes outside the ODE model.
+NETWORK_EDGES = (
+    ("NP", "CD40"),
+    *((source, target) for source, target, _, _ in CD40_NETWORK.edges()),
+    ("NFkB", "TCell"),
+)
+
+LAYOUT_SCALE = 250
+
+_network_cache = TrajectoryCache(max_entries=256, max_bytes=64 * 1024 * 1024)
+
+
+def get_network_cache():
+    return _network_cache
+
+
+@lru_cache(maxsize=32)
+def network_layout(nodes, edges, seed=7):
+    """Pixel positions for a topology, computed once and reused for every relabelling."""
+    import networkx as nx
+
+    graph = nx.DiGraph()
+    graph.add_nodes_from(nodes)
+    graph.add_edges_from(edges)
+    positions = nx.spring_layout(graph, seed=seed)
+    return {node: (float(x) * LAYOUT_SCALE, float(y) * LAYOUT_SCALE) for node, (x, y) in positions.items()}
+
+
+def network_labels(scaffold, ligand, k1, k2, k3, k4, k6, k7, k8):
+    """Node labels and edge tooltips for the current sidebar state."""
+    rates = {"k1": k1, "k2": k2, "k3": k3, "k4": k4, "k6": k6, "k7": k7, "k8": k8}
+    node_labels = {
+        "NP": f"Vehicle\n({scaffold})",
+        "CD40": f"CD40\n({ligand})",
+        **{entry["name"]: entry.get("label", entry["name"]) for entry in CD40_NETWORK.species},
+        "TCell": "T-Cell Response",
+    }
+    edge_titles = {("NP", "CD40"): "Scaffold-mediated clustering"}
+    for source, target, kind, rate_names in CD40_NETWORK.edges():
+        if kind == "inhibition":
+            edge_titles[(source, target)] = "inhibition " + ", ".join(f"{name}={rates[name]:.2f}" for name in rate_names)
+        else:
+            # Activation edges also show the target's own decay constant.
+            names = rate_names + CD40_NETWORK.decay_rates(target)
+            edge_titles[(source, target)] = ", ".join(f"{name}={rates[name]:.2f}" for name in names)
+    edge_titles[("NFkB", "TCell")] = "Effector activation"
+    return node_labels, edge_titles
+
+
+def build_network_html(node_labels, edge_titles, nodes=NETWORK_NODES, edges=NETWORK_EDGES):
+    """Render the topology to an HTML string with precomputed, fixed node positions."""
+    from pyvis.network import Network
+
+    layout = network_layout(tuple(node for node, _ in nodes), edges)
+    net = Network(height="500px", width="100%", bgcolor="white", font_color="black")
+    for node, style in nodes:
+        x, y = layout[node]
+        net.add_node(node, label=node_labels.get(node, node), x=x, y=y, physics=False, **style)
+    for source, target in edges:
+        net.add_edge(source, target, title=edge_titles.get((source, target), ""))
+    net.toggle_physics(False)
+    return net.generate_html()
+
+
+def render_network_html(scaffold, ligand, k1, k2, k3, k4, k6, k7, k8):
+    """Cached topology HTML keyed by what is actually displayed (k-values at 2 decimals)."""
+    node_labels, edge_titles = network_labels(scaffold, ligand, k1, k2, k3, k4, k6, k7, k8)
+    key = (tuple(sorted(node_labels.items())), tuple(sorted(edge_titles.items())))
+    html = _network_cache.get(key)
+    if html is None:
+        html = build_network_html(node_labels, edge_titles)
+        _network_cache.put(key, html, len(html.encode("utf-8")))
+    return html
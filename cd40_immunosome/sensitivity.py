@@ -0,0 +1,181 @@
+"""Global sensitivity analysis: Morris screening and Sobol indices."""
+
+import numpy as np
+
+from .metrics import evaluate_response_metrics
+from .model import PARAMETER_RANGES, RATE_CONSTANTS, parameter_bounds
+
+MORRIS_INDICES = ("mu", "mu_star", "sigma", "mu_star_low", "mu_star_high")
+SOBOL_INDICES = ("S1", "S1_low", "S1_high", "ST", "ST_low", "ST_high")
+
+
+def morris_sample(n_trajectories, bounds, levels=4, seed=None):
+    """Morris one-at-a-time trajectory design.
+
+    Each trajectory has k + 1 points and moves one parameter at a time by
+    Δ = levels / (2·(levels - 1)) in the unit hypercube. Returns the
+    design scaled to ``bounds`` with shape (n_trajectories·(k + 1), k), and
+    the matching unit-cube design.
+    """
+    rng = np.random.default_rng(seed)
+    k = bounds.shape[0]
+    delta = levels / (2.0 * (levels - 1))
+
+    lower = np.tril(np.ones((k + 1, k)), -1)
+    base = rng.integers(0, levels // 2, size=(n_trajectories, 1, k)) / (levels - 1)
+    signs = rng.choice([-1.0, 1.0], size=(n_trajectories, 1, k))
+    order = np.argsort(rng.random((n_trajectories, k)), axis=1)
+
+    # B* = (J·x* + Δ/2·[(2B - J)·D* + J])·P*, applied to every trajectory at once.
+    unit = base + (delta / 2.0) * ((2.0 * lower - 1.0) * signs + 1.0)
+    unit = np.take_along_axis(unit, order[:, None, :], axis=2).reshape(-1, k)
+    return bounds[:, 0] + unit * (bounds[:, 1] - bounds[:, 0]), unit
+
+
+def morris_indices(unit, outputs, k, n_bootstrap=500, confidence=0.95, seed=None):
+    """Elementary-effect statistics μ, μ* and σ per parameter, with a bootstrap CI on μ*.
+
+    Trajectories with a non-finite output are left out; ``dropped`` counts them.
+    """
+    rng = np.random.default_rng(seed)
+    unit = unit.reshape(-1, k + 1, k)
+    outputs = np.asarray(outputs, dtype=float).reshape(-1, k + 1)
+    finite = np.isfinite(outputs).all(axis=1)
+    unit, outputs = unit[finite], outputs[finite]
+    if not finite.any():
+        return {name: np.full(k, np.nan) for name in MORRIS_INDICES} | {"dropped": len(finite)}
+
+    step = np.diff(unit, axis=1)
+    moved = np.argmax(np.abs(step), axis=2)
+    effects = np.empty((unit.shape[0], k))
+    rows = np.arange(unit.shape[0])[:, None]
+    effects[rows, moved] = np.diff(outputs, axis=1) / np.take_along_axis(step, moved[:, :, None], axis=2)[:, :, 0]
+
+    resamples = rng.integers(0, effects.shape[0], size=(n_bootstrap, effects.shape[0]))
+    boot_mu_star = np.abs(effects)[resamples].mean(axis=1)
+    alpha = (1.0 - confidence) / 2.0
+    return {
+        "mu": effects.mean(axis=0),
+        "mu_star": np.abs(effects).mean(axis=0),
+        "sigma": effects.std(axis=0, ddof=1),
+        "mu_star_low": np.quantile(boot_mu_star, alpha, axis=0),
+        "mu_star_high": np.quantile(boot_mu_star, 1.0 - alpha, axis=0),
+        "dropped": int((~finite).sum()),
+    }
+
+
+def saltelli_sample(n_base, bounds, seed=None):
+    """Saltelli design: matrices A, B and the k hybrids AB_i (column i of A taken from B).
+
+    Returns the scaled design of shape (n_base·(k + 2), k), ordered as
+    A, B, AB_1, ..., AB_k.
+    """
+    rng = np.random.default_rng(seed)
+    k = bounds.shape[0]
+    a = rng.random((n_base, k))
+    b = rng.random((n_base, k))
+    hybrids = np.repeat(a[None, :, :], k, axis=0)
+    hybrids[np.arange(k), :, np.arange(k)] = b.T
+    unit = np.concatenate([a, b, hybrids.reshape(-1, k)])
+    return bounds[:, 0] + unit * (bounds[:, 1] - bounds[:, 0])
+
+
+def sobol_indices(outputs, k, n_bootstrap=500, confidence=0.95, seed=None):
+    """First-order (Saltelli 2010) and total-order (Jansen) Sobol indices with bootstrap CIs.
+
+    ``outputs`` must follow the ``saltelli_sample`` row order. Base samples
+    with a non-finite output in A, B or any hybrid are left out; ``dropped``
+    counts them.
+    """
+    rng = np.random.default_rng(seed)
+    outputs = np.asarray(outputs, dtype=float)
+    n_base = outputs.shape[0] // (k + 2)
+    f_a = outputs[:n_base]
+    f_b = outputs[n_base:2 * n_base]
+    f_ab = outputs[2 * n_base:].reshape(k, n_base)
+    finite = np.isfinite(f_a) & np.isfinite(f_b) & np.isfinite(f_ab).all(axis=0)
+    f_a, f_b, f_ab = f_a[finite], f_b[finite], f_ab[:, finite]
+    n_base = len(f_a)
+    if not n_base:
+        return {name: np.full(k, np.nan) for name in SOBOL_INDICES} | {"dropped": len(finite)}
+
+    def estimate(idx):
+        # idx has shape (..., n_base); the estimators broadcast over leading axes.
+        a, b, ab = f_a[idx], f_b[idx], f_ab[:, idx]
+        variance = np.concatenate([a, b], axis=-1).var(axis=-1)
+        variance = np.where(variance > 0, variance, np.nan)
+        first = (b * (ab - a)).mean(axis=-1) / variance
+        total = 0.5 * ((a - ab) ** 2).mean(axis=-1) / variance
+        return first, total
+
+    s1, st_ = estimate(np.arange(n_base))
+    resamples = rng.integers(0, n_base, size=(n_bootstrap, n_base))
+    boot_s1, boot_st = estimate(resamples)
+    alpha = (1.0 - confidence) / 2.0
+    return {
+        "S1": s1,
+        "S1_low": np.quantile(boot_s1, alpha, axis=1),
+        "S1_high": np.quantile(boot_s1, 1.0 - alpha, axis=1),
+        "ST": st_,
+        "ST_low": np.quantile(boot_st, alpha, axis=1),
+        "ST_high": np.quantile(boot_st, 1.0 - alpha, axis=1),
+        "dropped": int((~finite).sum()),
+    }
+
+
+def run_global_sensitivity(
+    method="sobol", n_samples=1024, cd40_input=1.0, names=RATE_CONSTANTS, seed=None, metric_method="dopri5",
+    points=1000, chunk_size=2048, n_bootstrap=500, progress=None, return_samples=False,
+):
+    """Morris screening or Sobol analysis of every response metric over the slider ranges.
+
+    ``n_samples`` is the number of Morris trajectories or the Sobol base
+    sample size. The model is evaluated ``n_samples·(k + 1)`` or
+    ``n_samples·(k + 2)`` times respectively, in chunked batches, with the
+    adaptive solver by default: Morris designs sit on the corners of the
+    slider box, where fixed-step RK4 (``metric_method="rk4"``, ``points``
+    grid) can diverge.
+
+    Returns a dict with the parameter ``names``, the evaluation count, the
+    number of evaluations with a non-finite metric (``nonfinite``) and, per
+    metric, a dict of index arrays aligned with ``names`` plus the count of
+    trajectories or base samples left out of it (``dropped``). With
+    ``return_samples=True`` it also holds ``"samples"``: the evaluated
+    ``rates`` (n, 7) and each metric's (n,) outputs.
+    """
+    bounds = parameter_bounds(names)
+    k = len(names)
+    if method == "morris":
+        design, unit = morris_sample(n_samples, bounds, seed=seed)
+    elif method == "sobol":
+        design = saltelli_sample(n_samples, bounds, seed=seed)
+    else:
+        raise ValueError(f"Unknown sensitivity method: {method!r}")
+
+    # Parameters not under analysis are held at their slider defaults.
+    rates = np.array([[PARAMETER_RANGES[name][3] for name in RATE_CONSTANTS]] * design.shape[0])
+    for column, name in enumerate(names):
+        rates[:, RATE_CONSTANTS.index(name)] = design[:, column]
+
+    metrics = evaluate_response_metrics(
+        rates, cd40_input, points=points, chunk_size=chunk_size, progress=progress, method=metric_method
+    )
+    nonfinite = ~np.all([np.isfinite(values) for values in metrics.values()], axis=0)
+
+    indices = {}
+    for metric, values in metrics.items():
+        if method == "morris":
+            indices[metric] = morris_indices(unit, values, k, n_bootstrap=n_bootstrap, seed=seed)
+        else:
+            indices[metric] = sobol_indices(values, k, n_bootstrap=n_bootstrap, seed=seed)
+
+    result = {
+        "method": method,
+        "names": list(names),
+        "evaluations": design.shape[0],
+        "nonfinite": int(nonfinite.sum()),
+        "indices": indices,
+    }
+    if return_samples:
+        result["samples"] = {"rates": rates, **metrics}
+    return result
@@ -0,0 +1,130 @@
+"""Intrinsic-noise ensembles: many single cells simulated stochastically at once.
+
+The rate perturbations of ``montecarlo`` model cell-to-cell differences in
+parameters; here every cell shares the same parameters and the noise comes
+from finite molecule numbers. ``volume`` is the system size Ω, the number
+of molecules per concentration unit, so small Ω (or a low CD40 input) means
+few molecules and large fluctuations, and Ω → ∞ recovers the ODE.
+"""
+
+import numpy as np
+
+from . import instrumentation
+from .jobs import process_map, worker_count
+from .model import RATE_CONSTANTS
+from .reactions import CD40_NETWORK, simulate_network_batch, simulate_network_ssa, simulate_network_tau_leap
+
+STOCHASTIC_METHODS = ("auto", "ssa", "tau_leap")
+
+# Above this many expected reaction events per cell, one vectorized tau leap
+# (which covers many events) is cheaper than the one-event-per-step SSA.
+SSA_MAX_EVENTS = 2000
+
+STOCHASTIC_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+STOCHASTIC_SAMPLE_CELLS = 20
+
+_NFKB = CD40_NETWORK.species_names.index("NFkB")
+
+
+def _network_params(k1, k2, k3, k4, k6, k7, k8, cd40_input):
+    return {**dict(zip(RATE_CONSTANTS, (k1, k2, k3, k4, k6, k7, k8))), "cd40_input": cd40_input}
+
+
+def expected_events(k1, k2, k3, k4, k6, k7, k8, cd40_input, volume=100.0, t_max=200):
+    """Mean number of reaction events per cell up to ``t_max``: Ω · ∫ Σ fluxes dt along the ODE path."""
+    params = _network_params(k1, k2, k3, k4, k6, k7, k8, cd40_input)
+    t, states = simulate_network_batch(CD40_NETWORK, params, t_max=t_max, points=401)
+    coefficients = CD40_NETWORK.rate_coefficients(CD40_NETWORK.parameter_matrix(params))
+    fluxes = CD40_NETWORK.fluxes(states[:, :, 0].T, np.broadcast_to(coefficients, (len(coefficients), len(t))))
+    return float(volume * np.trapezoid(fluxes.sum(axis=0), t))
+
+
+def _stochastic_shard(task):
+    """Simulate one shard of cells and return their NF-κB trajectories and peak metrics."""
+    seed_seq, count, params, volume, t_max, points, method = task
+    solver = simulate_network_ssa if method == "ssa" else simulate_network_tau_leap
+    t, states = solver(CD40_NETWORK, params, volume=volume, cells=count, t_max=t_max, points=points, seed=seed_seq)
+    nfkb = states[:, _NFKB, :].T
+    peak_index = np.argmax(nfkb, axis=1)
+    return {
+        "nfkb": nfkb.astype(np.float32),
+        "peak": nfkb[np.arange(count), peak_index],
+        "t_peak": t[peak_index],
+    }
+
+
+def run_stochastic_ensemble(
+    k1, k2, k3, k4, k6, k7, k8, cd40_input, volume=100.0, cells=10_000, t_max=200, points=401, method="auto",
+    seed=None, workers=None, chunk_size=2000, progress=None,
+):
+    """Simulate ``cells`` independent cells with intrinsic noise at system size ``volume``.
+
+    ``method="ssa"`` is the exact Gillespie algorithm, ``"tau_leap"``
+    Poisson tau-leaping; ``"auto"`` takes SSA while the expected number of
+    reaction events per cell is at most ``SSA_MAX_EVENTS`` and tau-leaping
+    above. Cells are cut into ``chunk_size`` shards seeded from
+    ``SeedSequence(seed).spawn``, so a given seed gives identical results
+    for any ``workers`` value (``None`` for one process per CPU).
+    ``progress(done, total)`` is called with cell counts after every shard.
+
+    Returns a dict with the time grid, the deterministic NF-κB curve on it,
+    the ensemble mean, standard deviation and ``STOCHASTIC_QUANTILES`` bands,
+    per-cell ``peak`` and ``t_peak`` arrays with their summary statistics
+    (peaks read off the grid for cells and ODE alike), and the first
+    ``STOCHASTIC_SAMPLE_CELLS`` single-cell trajectories.
+    """
+    if method not in STOCHASTIC_METHODS:
+        raise ValueError(f"method must be one of {STOCHASTIC_METHODS}, got {method!r}")
+    if cells < 1:
+        raise ValueError("An ensemble needs at least one cell.")
+    params = _network_params(k1, k2, k3, k4, k6, k7, k8, cd40_input)
+    events = expected_events(k1, k2, k3, k4, k6, k7, k8, cd40_input, volume=volume, t_max=t_max)
+    if method == "auto":
+        method = "ssa" if events <= SSA_MAX_EVENTS else "tau_leap"
+
+    t, states = simulate_network_batch(CD40_NETWORK, params, t_max=t_max, points=points)
+    deterministic = states[:, _NFKB, 0]
+
+    shard_sizes = [min(chunk_size, cells - start) for start in range(0, cells, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(shard_sizes))
+    tasks = [(seed_seq, count, params, volume, t_max, points, method) for seed_seq, count in zip(seeds, shard_sizes)]
+
+    shards = []
+
+    def collect(shard):
+        shards.append(shard)
+        if progress is not None:
+            progress(sum(len(done["peak"]) for done in shards), cells)
+
+    workers = worker_count(workers, len(tasks))
+    with process_map(_stochastic_shard, tasks, workers) as results:
+        for shard in results:
+            collect(shard)
+    if workers > 1:
+        # Worker processes have their own counters; account for their cells here
+        # (event and leap counts stay in the workers).
+        instrumentation.record_solve(f"network_{method}", cells, points - 1)
+
+    nfkb, peak, t_peak = (np.concatenate([shard[name] for shard in shards]) for name in ("nfkb", "peak", "t_peak"))
+    deterministic_index = int(np.argmax(deterministic))
+    return {
+        "t": t,
+        "method": method,
+        "volume": float(volume),
+        "cells": int(cells),
+        "expected_events": events,
+        "deterministic": deterministic,
+        "deterministic_peak": float(deterministic[deterministic_index]),
+        "deterministic_t_peak": float(t[deterministic_index]),
+        "mean": nfkb.mean(axis=0, dtype=float),
+        "std": nfkb.std(axis=0, dtype=float),
+        "quantiles": dict(zip(STOCHASTIC_QUANTILES, np.quantile(nfkb, STOCHASTIC_QUANTILES, axis=0))),
+        "samples": nfkb[:STOCHASTIC_SAMPLE_CELLS],
+        "peak": peak,
+        "t_peak": t_peak,
+        "peak_mean": float(peak.mean()),
+        "peak_std": float(peak.std()),
+        "peak_cv": float(peak.std() / peak.mean()) if peak.mean() else float("nan"),
+        "t_peak_mean": float(t_peak.mean()),
+        "t_peak_std": float(t_peak.std()),
+    }
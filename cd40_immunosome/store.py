@@ -0,0 +1,382 @@
+"""Persistent on-disk store for Monte Carlo ensembles and sensitivity sweeps.
+
+Each result lives in its own directory named by ``result_key``: a hash of
+the run kind, its parameters, seed and solver settings, and
+``MODEL_VERSION`` (which changes whenever the reaction network or
+``SOLVER_VERSION`` does).
+Per-run arrays are float32 ``.npy`` files written shard by shard through
+``open_memmap`` and reopened with ``mmap_mode="r"``, so reloading a
+100k-run ensemble maps the files instead of recomputing or reading them.
+Settings and scalar results go to ``meta.json``, summary arrays to
+``summary.npz``.
+
+Results are written to a temporary directory and renamed into place when
+complete, so readers never see a partial result and a cancelled run
+leaves nothing behind; temporary directories orphaned by a killed process
+are removed once they are a day old. Once the store exceeds its byte
+budget, the least recently opened results are evicted.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from .jobs import job_key
+from .montecarlo import iter_monte_carlo_streaming
+from .reactions import CD40_NETWORK
+from .sensitivity import run_global_sensitivity
+
+STORE_FORMAT = 1
+# Results come from the fused RK4 kernel and the adaptive solver, not the declarative network:
+# bump this with any change to solver or metric code that can alter stored outputs.
+SOLVER_VERSION = 1
+# Changes with the network equations and SOLVER_VERSION, so stale results are never reused.
+MODEL_VERSION = f"{STORE_FORMAT}.{SOLVER_VERSION}." + hashlib.sha256("\n".join(CD40_NETWORK.equations()).encode("utf-8")).hexdigest()[:12]
+
+DEFAULT_STORE_DIR = Path.home() / ".cache" / "cd40_immunosome" / "results"
+DEFAULT_STORE_MAX_BYTES = 5 * 1024**3
+# Streamlit holds a download in server memory, so the dashboard only offers results up to this size.
+ARCHIVE_DOWNLOAD_MAX_BYTES = 256 * 1024**2
+# Temporary result directories older than this belong to a writer that died without cleaning up.
+STALE_WRITE_SECONDS = 24 * 3600
+
+
+def result_key(kind, settings):
+    """Hex key of a run: its kind, every setting that affects the output, and ``MODEL_VERSION``."""
+    return job_key(kind, kwargs={**settings, "model_version": MODEL_VERSION})
+
+
+def _split_summary(summary):
+    """(JSON-safe scalars, arrays) halves of a summary dict."""
+    scalars, arrays = {}, {}
+    for name, value in summary.items():
+        if isinstance(value, np.ndarray):
+            arrays[name] = value
+        elif isinstance(value, np.generic):
+            scalars[name] = value.item()
+        else:
+            scalars[name] = value
+    return scalars, arrays
+
+
+class StoredResult:
+    """Read-only view of one stored result; arrays are memory-mapped on access."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.key = self.path.name
+        self.meta = json.loads((self.path / "meta.json").read_text())
+
+    @property
+    def names(self):
+        return tuple(self.meta["arrays"])
+
+    def __getitem__(self, name):
+        if name not in self.meta["arrays"]:
+            raise KeyError(name)
+        return np.load(self.path / f"{name}.npy", mmap_mode="r")
+
+    def summary(self):
+        """Scalars from ``meta.json`` merged with the arrays of ``summary.npz``."""
+        summary = dict(self.meta.get("summary", {}))
+        summary_path = self.path / "summary.npz"
+        if summary_path.exists():
+            with np.load(summary_path) as arrays:
+                summary.update({name: arrays[name] for name in arrays.files})
+        return summary
+
+    @property
+    def nbytes(self):
+        return sum(path.stat().st_size for path in self.path.iterdir())
+
+    def write_archive(self, fileobj):
+        """Write every file of the result (``.npy`` arrays, ``meta.json``, ``summary.npz``) as a zip."""
+        with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for path in sorted(self.path.iterdir()):
+                archive.write(path, arcname=f"{self.key}/{path.name}")
+
+    def archive_file(self):
+        """The zip streamed to an anonymous temporary file, rewound for reading.
+
+        The archive never has to fit in memory; the file is deleted when closed.
+        """
+        fileobj = tempfile.TemporaryFile(suffix=".zip")
+        try:
+            self.write_archive(fileobj)
+        except BaseException:
+            fileobj.close()
+            raise
+        fileobj.seek(0)
+        return fileobj
+
+
+class ResultWriter:
+    """Fills the arrays of a new result and publishes it atomically on ``commit``.
+
+    Used as a context manager: leaving the block with an exception (including
+    a closed generator) before ``commit`` discards everything written.
+    """
+
+    def __init__(self, store, key, kind, settings, arrays):
+        self.store = store
+        self.key = key
+        self.kind = kind
+        self.settings = settings
+        self.path = store.root / f".{key}.{uuid.uuid4().hex}.tmp"
+        self.path.mkdir(parents=True)
+        self.arrays = {
+            name: np.lib.format.open_memmap(self.path / f"{name}.npy", mode="w+", dtype=dtype, shape=shape)
+            for name, (shape, dtype) in arrays.items()
+        }
+        self.result = None
+
+    def write(self, name, start, values):
+        self.arrays[name][start : start + len(values)] = values
+
+    def write_rows(self, start, columns):
+        """Write each ``name → values`` column starting at row ``start``."""
+        for name, values in columns.items():
+            self.write(name, start, values)
+
+    def commit(self, summary=None, result=None):
+        """Flush arrays, write metadata and rename the result into place."""
+        for array in self.arrays.values():
+            array.flush()
+        shapes = {name: {"shape": list(array.shape), "dtype": str(array.dtype)} for name, array in self.arrays.items()}
+        self.arrays = {}
+        scalars, summary_arrays = _split_summary(summary or {})
+        if summary_arrays:
+            np.savez(self.path / "summary.npz", **summary_arrays)
+        meta = {
+            "key": self.key,
+            "kind": self.kind,
+            "model_version": MODEL_VERSION,
+            "created": time.time(),
+            "settings": self.settings,
+            "arrays": shapes,
+            "summary": scalars,
+            "result": result,
+        }
+        (self.path / "meta.json").write_text(json.dumps(meta, indent=1))
+        final = self.store.root / self.key
+        try:
+            os.replace(self.path, final)
+        except OSError:
+            # Another process stored the same key first; its result is identical.
+            shutil.rmtree(self.path, ignore_errors=True)
+        self.result = StoredResult(final)
+        self.store.prune()
+        return self.result
+
+    def abort(self):
+        self.arrays = {}
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.result is None:
+            self.abort()
+        return False
+
+
+class ResultStore:
+    """Directory of stored results, evicted least-recently-opened first beyond ``max_bytes``."""
+
+    def __init__(self, root=None, max_bytes=DEFAULT_STORE_MAX_BYTES):
+        self.root = Path(root or DEFAULT_STORE_DIR)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.prune()
+
+    def key(self, kind, **settings):
+        return result_key(kind, settings)
+
+    def open(self, key):
+        """The stored result for ``key``, or ``None``. Marks it as recently used."""
+        path = self.root / key
+        if not (path / "meta.json").exists():
+            return None
+        os.utime(path / "meta.json")
+        return StoredResult(path)
+
+    def create(self, key, kind, settings, arrays):
+        """Writer for a new result; ``arrays`` maps names to ``(shape, dtype)``."""
+        return ResultWriter(self, key, kind, settings, arrays)
+
+    def put(self, key, kind, settings, arrays=None, summary=None, result=None):
+        """Store in-memory arrays (as float32) in one step."""
+        arrays = {name: np.asarray(values, dtype=np.float32) for name, values in (arrays or {}).items()}
+        with self.create(key, kind, settings, {name: (values.shape, np.float32) for name, values in arrays.items()}) as writer:
+            writer.write_rows(0, arrays)
+            return writer.commit(summary=summary, result=result)
+
+    def list(self, kind=None):
+        """Metadata of every stored result (optionally of one ``kind``), most recently used first."""
+        entries = []
+        for meta_path in self.root.glob("*/meta.json"):
+            if meta_path.parent.name.startswith("."):
+                continue  # result still being written
+            try:
+                meta = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                continue
+            if kind is None or meta["kind"] == kind:
+                meta["last_used"] = meta_path.stat().st_mtime
+                meta["nbytes"] = sum(path.stat().st_size for path in meta_path.parent.iterdir())
+                entries.append(meta)
+        return sorted(entries, key=lambda meta: meta["last_used"], reverse=True)
+
+    def delete(self, key):
+        shutil.rmtree(self.root / key, ignore_errors=True)
+
+    def prune(self):
+        """Evict least recently used results until the store fits ``max_bytes``.
+
+        Also removes temporary directories of writes abandoned more than
+        ``STALE_WRITE_SECONDS`` ago.
+        """
+        with self._lock:
+            cutoff = time.time() - STALE_WRITE_SECONDS
+            for path in self.root.glob(".*.tmp"):
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        shutil.rmtree(path, ignore_errors=True)
+                except OSError:
+                    continue
+            entries = self.list()
+            total = sum(meta["nbytes"] for meta in entries)
+            for meta in reversed(entries[1:]):
+                if total <= self.max_bytes:
+                    break
+                self.delete(meta["key"])
+                total -= meta["nbytes"]
+
+
+_result_store = None
+_result_store_lock = threading.Lock()
+
+
+def get_result_store():
+    """One store per server process, shared by every session.
+
+    ``CD40_STORE_DIR`` sets its directory (default ``~/.cache/cd40_immunosome/results``)
+    and ``CD40_STORE_MAX_GB`` its size budget (default 5).
+    """
+    global _result_store
+    with _result_store_lock:
+        if _result_store is None:
+            max_gb = float(os.environ.get("CD40_STORE_MAX_GB", DEFAULT_STORE_MAX_BYTES / 1024**3))
+            _result_store = ResultStore(os.environ.get("CD40_STORE_DIR") or None, max_bytes=int(max_gb * 1024**3))
+        return _result_store
+
+
+def iter_monte_carlo_stored(
+    k1, k2, k3, k4, k6, k7, k8, cd40_input, iterations=100_000, t_max=200, points=800, seed=None,
+    workers=None, chunk_size=1000, auc_bins=20, auc_range=None, method="dopri5", progress=None, store=None,
+):
+    """``iter_monte_carlo_streaming`` that also keeps every run, or reloads a stored ensemble.
+
+    Every summary carries the ``store_key`` of the ensemble. A stored run
+    yields its summary once, without recomputation; otherwise per-run
+    float32 ``nfkb`` trajectories, perturbed ``rates``, ``peak``, ``t_peak``
+    and ``auc`` are written shard by shard and published when the last
+    shard is in. ``seed=None`` draws fresh entropy, which is stored so the
+    run stays reproducible. ``workers`` does not affect results and is not
+    part of the key.
+    """
+    store = store or get_result_store()
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    settings = {
+        **{name: float(value) for name, value in zip(("k1", "k2", "k3", "k4", "k6", "k7", "k8"), (k1, k2, k3, k4, k6, k7, k8))},
+        "cd40_input": float(cd40_input),
+        "iterations": int(iterations),
+        "t_max": float(t_max),
+        "points": int(points),
+        "seed": int(seed),
+        "chunk_size": int(chunk_size),
+        "auc_bins": int(auc_bins),
+        "auc_range": None if auc_range is None else [float(value) for value in auc_range],
+        "method": method,
+    }
+    key = store.key("monte_carlo", **settings)
+    stored = store.open(key)
+    if stored is not None:
+        if progress is not None:
+            progress(iterations, iterations)
+        yield {**stored.summary(), "store_key": key}
+        return
+
+    arrays = {
+        "nfkb": ((iterations, points), np.float32),
+        "rates": ((iterations, 7), np.float32),
+        "peak": ((iterations,), np.float32),
+        "t_peak": ((iterations,), np.float32),
+        "auc": ((iterations,), np.float32),
+    }
+    with store.create(key, "monte_carlo", settings, arrays) as writer:
+        summary = None
+        for summary in iter_monte_carlo_streaming(
+            k1, k2, k3, k4, k6, k7, k8, cd40_input, iterations=iterations, t_max=t_max, points=points, seed=seed,
+            workers=workers, chunk_size=chunk_size, auc_bins=auc_bins, auc_range=auc_range, method=method,
+            progress=progress, sink=writer.write_rows,
+        ):
+            yield {**summary, "store_key": key}
+        writer.commit(summary=summary)
+
+
+def global_sensitivity_stored(
+    method="sobol", n_samples=1024, cd40_input=1.0, seed=None, metric_method="dopri5", points=1000, n_bootstrap=500,
+    progress=None, store=None,
+):
+    """``run_global_sensitivity`` over all rate constants, reloaded from the store when available.
+
+    The evaluated design (``rates``) and every metric's outputs are stored
+    as float32 arrays next to the indices; the returned dict carries
+    ``store_key``.
+    """
+    store = store or get_result_store()
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    settings = {
+        "method": method,
+        "n_samples": int(n_samples),
+        "cd40_input": float(cd40_input),
+        "seed": int(seed),
+        "metric_method": metric_method,
+        "points": int(points),
+        "n_bootstrap": int(n_bootstrap),
+    }
+    key = store.key("global_sensitivity", **settings)
+    stored = store.open(key)
+    if stored is None:
+        result = run_global_sensitivity(
+            method=method, n_samples=n_samples, cd40_input=cd40_input, seed=seed, metric_method=metric_method,
+            points=points, n_bootstrap=n_bootstrap, progress=progress, return_samples=True,
+        )
+        samples = result.pop("samples")
+        indices = {
+            metric: {name: np.asarray(values).tolist() for name, values in entry.items()}
+            for metric, entry in result["indices"].items()
+        }
+        result = {**result, "evaluations": int(result["evaluations"]), "indices": indices}
+        stored = store.put(key, "global_sensitivity", settings, arrays=samples, result=result)
+    elif progress is not None:
+        progress(stored.meta["result"]["evaluations"], stored.meta["result"]["evaluations"])
+    result = dict(stored.meta["result"])
+    result["indices"] = {
+        metric: {name: np.asarray(values) for name, values in entry.items()} for metric, entry in result["indices"].items()
+    }
+    return {**result, "store_key": key}
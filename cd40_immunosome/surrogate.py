@@ -0,0 +1,305 @@
+"""Precomputed response surface for instant feedback inside the slider box.
+
+``build_surrogate`` evaluates the NF-κB summary metrics of
+``evaluate_response_metrics`` (adaptive solver) on a tensor grid over
+``PARAMETER_RANGES``, covering every rate constant and the CD40 input. The
+table is kept in the result store, so it is built once and then
+memory-mapped by every process.
+
+The metrics are close to power laws of the rates (the linear steady state
+is k1·k3·CD40 / (k2·k4)), so the table holds log-metrics on log-spaced
+axes. Axes whose range starts at zero (k6, k7) are log-spaced in
+``x + SURROGATE_SHIFT · range``. ``ResponseSurrogate`` interpolates
+multilinearly in those coordinates.
+
+Every answer carries a relative error bound. The curvature of the table
+along each axis gives the classical ``h²/8 · |f''|`` interpolation error at
+every node, which is interpolated like the values. That estimate is scaled
+by a factor fitted at build time so the bound covers ``SURROGATE_COVERAGE``
+of the errors on random held-out points. ``query`` falls back to the
+exact solver wherever the bound exceeds the tolerance.
+"""
+
+import threading
+
+import numpy as np
+
+from .jobs import process_map, worker_count
+from .metrics import RESPONSE_METRICS, evaluate_response_metrics
+from .model import PARAMETER_RANGES, RATE_CONSTANTS
+from .store import get_result_store
+
+SURROGATE_PARAMETERS = RATE_CONSTANTS + ("cd40_input",)
+SURROGATE_NODES = 6
+SURROGATE_SHIFT = 0.1
+SURROGATE_COVERAGE = 0.95
+SURROGATE_TOLERANCE = 0.05
+
+
+def surrogate_shifts():
+    """Offset added to each parameter before taking logs: 0, or a tenth of the range for zero lower bounds."""
+    return np.array(
+        [
+            0.0 if PARAMETER_RANGES[name][1] > 0 else SURROGATE_SHIFT * (PARAMETER_RANGES[name][2] - PARAMETER_RANGES[name][1])
+            for name in SURROGATE_PARAMETERS
+        ]
+    )
+
+
+def surrogate_axes(nodes=SURROGATE_NODES):
+    """Node coordinates for every parameter in ``SURROGATE_PARAMETERS`` order, log-spaced with both bounds on the grid."""
+    axes = []
+    for name, shift in zip(SURROGATE_PARAMETERS, surrogate_shifts()):
+        low, high = PARAMETER_RANGES[name][1:3]
+        axis = np.exp(np.linspace(np.log(low + shift), np.log(high + shift), nodes)) - shift
+        axis[[0, -1]] = low, high
+        axes.append(axis)
+    return tuple(axes)
+
+
+def _surrogate_settings(nodes=SURROGATE_NODES, t_max=200, validation=2000, seed=0):
+    return {"nodes": int(nodes), "t_max": float(t_max), "validation": int(validation), "seed": int(seed)}
+
+
+def _grid_points(axes, start, stop):
+    """(stop - start, n_parameters) parameter rows for flat grid indices ``start:stop`` (C order)."""
+    index = np.unravel_index(np.arange(start, stop), tuple(len(axis) for axis in axes))
+    return np.column_stack([axis[i] for axis, i in zip(axes, index)])
+
+
+def _evaluate_shard(task):
+    points, t_max = task
+    return evaluate_response_metrics(points[:, :7], points[:, 7], t_max=t_max, method="dopri5")
+
+
+def _log_metric(values):
+    return np.log(np.maximum(values, 1e-300))
+
+
+def _curvature_error(values, coordinates):
+    """Per-node ``Σ_d h_d²/8 · |∂²f/∂u_d²|`` from grid second differences (``h_d`` the wider neighbouring step)."""
+    ndim = values.ndim
+    error = np.zeros(values.shape)
+    column = [1] * (ndim - 1)
+    for d, u in enumerate(coordinates):
+        h = np.diff(u)
+        slopes = np.diff(np.moveaxis(values, d, 0), axis=0) / h.reshape(-1, *column)
+        curvature = np.abs(2 * np.diff(slopes, axis=0) / (h[:-1] + h[1:]).reshape(-1, *column))
+        # Boundary nodes take their neighbour's estimate.
+        curvature = np.concatenate([curvature[:1], curvature, curvature[-1:]])
+        step = np.maximum(np.concatenate([h[:1], h]), np.concatenate([h, h[-1:]]))
+        error += np.moveaxis(curvature * (step**2 / 8).reshape(-1, *column), 0, d)
+    return error
+
+
+class ResponseSurrogate:
+    """Multilinear interpolation of log ``RESPONSE_METRICS`` on a log-spaced parameter grid.
+
+    ``log_values`` and ``log_errors`` map each metric to its log-values at the
+    grid nodes and to the per-node curvature estimate of the log
+    interpolation error; ``scales`` calibrate those estimates into bounds.
+    """
+
+    def __init__(self, axes, log_values, log_errors, scales, meta=None):
+        self.axes = tuple(np.asarray(axis, dtype=float) for axis in axes)
+        self.shifts = surrogate_shifts()
+        self.coordinates = tuple(np.log(axis + shift) for axis, shift in zip(self.axes, self.shifts))
+        self.shape = tuple(len(axis) for axis in self.axes)
+        self.log_values = {name: np.asarray(log_values[name]).reshape(self.shape) for name in RESPONSE_METRICS}
+        self.log_errors = {name: np.asarray(log_errors[name]).reshape(self.shape) for name in RESPONSE_METRICS}
+        self.scales = dict(scales)
+        self.meta = meta or {}
+        self.t_max = self.meta.get("settings", {}).get("t_max", 200.0)
+        self.low = np.array([axis[0] for axis in self.axes])
+        self.high = np.array([axis[-1] for axis in self.axes])
+
+        self._strides = np.cumprod((1,) + self.shape[:0:-1])[::-1]
+        corners = (np.arange(2 ** len(self.shape))[:, None] >> np.arange(len(self.shape))[::-1]) & 1
+        self._corner_offsets = corners @ self._strides
+
+    @classmethod
+    def from_stored(cls, stored):
+        result = stored.meta["result"]
+        return cls(
+            result["axes"],
+            {name: stored[name] for name in RESPONSE_METRICS},
+            {name: stored[f"{name}_error"] for name in RESPONSE_METRICS},
+            result["scales"],
+            meta=stored.meta,
+        )
+
+    def contains(self, points):
+        """Whether each (n_parameters,) row lies inside the grid box."""
+        points = np.atleast_2d(points)
+        return np.all((points >= self.low) & (points <= self.high), axis=1)
+
+    def evaluate(self, points):
+        """Interpolated metrics and relative error bounds for (Q, n_parameters) points.
+
+        Points outside the box are clipped onto it. Returns ``(values,
+        bounds)``, each a dict of (Q,) arrays; the true value is expected
+        within ``value · (1 ± bound)``.
+        """
+        points = np.clip(np.atleast_2d(np.asarray(points, dtype=float)), self.low, self.high)
+        cell = np.empty(points.shape, dtype=np.intp)
+        weight = np.empty(points.shape)
+        for d, u in enumerate(self.coordinates):
+            x = np.log(points[:, d] + self.shifts[d])
+            cell[:, d] = np.clip(np.searchsorted(u, x, side="right") - 1, 0, len(u) - 2)
+            weight[:, d] = np.clip((x - u[cell[:, d]]) / (u[cell[:, d] + 1] - u[cell[:, d]]), 0.0, 1.0)
+
+        # (Q, 2^d) corner weights Π_d (w_d or 1 - w_d), with the first parameter as the most significant bit.
+        corner_weights = np.ones((len(points), 1))
+        for d in range(len(self.shape)):
+            corner_weights = np.stack([corner_weights * (1.0 - weight[:, d : d + 1]), corner_weights * weight[:, d : d + 1]], axis=2)
+            corner_weights = corner_weights.reshape(len(points), -1)
+        corner_index = (cell @ self._strides)[:, None] + self._corner_offsets[None]
+        values, bounds = {}, {}
+        for name in RESPONSE_METRICS:
+            values[name] = np.exp((self.log_values[name].reshape(-1)[corner_index] * corner_weights).sum(axis=1))
+            estimate = (self.log_errors[name].reshape(-1)[corner_index] * corner_weights).sum(axis=1)
+            bounds[name] = np.expm1(self.scales[name] * estimate)
+        return values, bounds
+
+    def query(self, k1, k2, k3, k4, k6, k7, k8, cd40_input, tolerance=SURROGATE_TOLERANCE, metrics=RESPONSE_METRICS):
+        """Metrics for one or many parameter sets, exact wherever the table is not good enough.
+
+        A point is answered from the table when it lies inside the grid box
+        and the relative bound of every metric in ``metrics`` is at most
+        ``tolerance`` (a NaN bound never is) and every interpolated metric is
+        finite; the rest are solved exactly. Pass a subset of
+        ``RESPONSE_METRICS`` to gate only on the metrics you read: time to
+        peak jumps where the response switches between overshoot and
+        plateau, so its bound is rarely tight. Returns a dict with each
+        metric, its relative ``<metric>_bound`` (0 for exact answers) and a
+        boolean ``exact`` array.
+        """
+        params = np.column_stack(
+            np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=float)) for v in (k1, k2, k3, k4, k6, k7, k8, cd40_input)))
+        )
+        values, bounds = self.evaluate(params)
+        exact = ~self.contains(params)
+        for name in metrics:
+            exact |= ~(bounds[name] <= tolerance)  # a NaN bound is not within tolerance
+        for name in RESPONSE_METRICS:
+            exact |= ~np.isfinite(values[name])
+        if exact.any():
+            solved = _evaluate_shard((params[exact], self.t_max))
+            for name in RESPONSE_METRICS:
+                values[name][exact] = solved[name]
+                bounds[name][exact] = 0.0
+        return {**values, **{f"{name}_bound": bound for name, bound in bounds.items()}, "exact": exact}
+
+    def phase_diagram(self, k1, k2, k3, k4, k6, k7, k8, cd40_input, metric="peak", resolution=61):
+        """``metric`` over the k6 × k7 feedback plane at the other parameters, from the table alone.
+
+        ``k6`` and ``k7`` are ignored (the plane spans their whole range).
+        Returns ``(k6_values, k7_values, values, bounds)`` with values and
+        relative bounds of shape (len(k7_values), len(k6_values)).
+        """
+        k6_index, k7_index = SURROGATE_PARAMETERS.index("k6"), SURROGATE_PARAMETERS.index("k7")
+        k6_values = np.linspace(self.low[k6_index], self.high[k6_index], resolution)
+        k7_values = np.linspace(self.low[k7_index], self.high[k7_index], resolution)
+        k6_grid, k7_grid = np.meshgrid(k6_values, k7_values)
+        values, bounds = self.evaluate(
+            np.column_stack(np.broadcast_arrays(k1, k2, k3, k4, k6_grid.ravel(), k7_grid.ravel(), k8, cd40_input))
+        )
+        return k6_values, k7_values, values[metric].reshape(k6_grid.shape), bounds[metric].reshape(k6_grid.shape)
+
+
+def build_surrogate(
+    nodes=SURROGATE_NODES, t_max=200, validation=2000, seed=0, workers=None, chunk_size=16_384, progress=None,
+    store=None,
+):
+    """Build (or reload) the response surrogate and keep it in the result store.
+
+    Solves all ``nodes ** 8`` grid points in ``chunk_size`` shards
+    (``workers`` processes, ``None`` for one per CPU), then ``validation``
+    random held-out points that calibrate the error bounds; their errors
+    are kept in ``meta["result"]["validation"]``. ``progress(done, total)``
+    counts solved parameter sets. The store key includes
+    ``MODEL_VERSION``, so a changed network or solver gets a fresh table.
+    """
+    store = store or get_result_store()
+    settings = _surrogate_settings(nodes, t_max, validation, seed)
+    key = store.key("surrogate", **settings)
+    stored = store.open(key)
+    if stored is not None:
+        if progress is not None:
+            progress(1, 1)
+        return ResponseSurrogate.from_stored(stored)
+
+    axes = surrogate_axes(nodes)
+    shape = tuple(len(axis) for axis in axes)
+    size = int(np.prod(shape))
+    total = size + validation
+    log_values = {name: np.empty(size) for name in RESPONSE_METRICS}
+    tasks = ((_grid_points(axes, start, min(start + chunk_size, size)), t_max) for start in range(0, size, chunk_size))
+    done = 0
+
+    def collect(metrics):
+        nonlocal done
+        count = len(metrics["peak"])
+        for name in RESPONSE_METRICS:
+            log_values[name][done : done + count] = _log_metric(metrics[name])
+        done += count
+        if progress is not None:
+            progress(done, total)
+
+    with process_map(_evaluate_shard, tasks, worker_count(workers, -(-size // chunk_size))) as results:
+        for metrics in results:
+            collect(metrics)
+
+    coordinates = tuple(np.log(axis + shift) for axis, shift in zip(axes, surrogate_shifts()))
+    log_errors = {name: _curvature_error(log_values[name].reshape(shape), coordinates) for name in RESPONSE_METRICS}
+    scales = {name: 1.0 for name in RESPONSE_METRICS}
+    report = {}
+    if validation:
+        # Scale each curvature estimate so it covers SURROGATE_COVERAGE of the held-out errors.
+        surrogate = ResponseSurrogate(axes, log_values, log_errors, scales)
+        held_out = surrogate.low + np.random.default_rng(seed).random((validation, len(axes))) * (surrogate.high - surrogate.low)
+        exact = _evaluate_shard((held_out, t_max))
+        predicted, estimate = surrogate.evaluate(held_out)
+        for name in RESPONSE_METRICS:
+            actual = np.abs(_log_metric(predicted[name]) - _log_metric(exact[name]))
+            scales[name] = float(np.quantile(actual / np.maximum(np.log1p(estimate[name]), 1e-12), SURROGATE_COVERAGE))
+            relative = np.abs(predicted[name] / exact[name] - 1.0)
+            report[name] = {
+                "median_error": float(np.median(relative)),
+                "p95_error": float(np.quantile(relative, 0.95)),
+                "median_bound": float(np.median(np.expm1(scales[name] * np.log1p(estimate[name])))),
+            }
+        if progress is not None:
+            progress(total, total)
+
+    arrays = {name: ((size,), np.float64) for name in RESPONSE_METRICS}
+    arrays.update({f"{name}_error": ((size,), np.float32) for name in RESPONSE_METRICS})
+    with store.create(key, "surrogate", settings, arrays) as writer:
+        for name in RESPONSE_METRICS:
+            writer.arrays[name][:] = log_values[name]
+            writer.arrays[f"{name}_error"][:] = log_errors[name].reshape(-1)
+        stored = writer.commit(
+            result={
+                "axes": [axis.tolist() for axis in axes],
+                "scales": scales,
+                "coverage": SURROGATE_COVERAGE,
+                "validation": report,
+            }
+        )
+    return ResponseSurrogate.from_stored(stored)
+
+
+_surrogate = None
+_surrogate_lock = threading.Lock()
+
+
+def get_surrogate():
+    """The process-wide default surrogate from the result store, or ``None`` until it has been built."""
+    global _surrogate
+    with _surrogate_lock:
+        if _surrogate is None:
+            store = get_result_store()
+            stored = store.open(store.key("surrogate", **_surrogate_settings()))
+            if stored is not None:
+                _surrogate = ResponseSurrogate.from_stored(stored)
+        return _surrogate